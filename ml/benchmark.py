@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Model Backend Benchmark
+Compares the PyTorch T5, the int8 ONNX export and the classifier on CPU
+
+For each backend (loaded in a fresh process so memory is comparable):
+  - load time and resident memory after load / peak
+  - per-request latency p50 / p99 (one transcript per call, as served)
+  - exact-match accuracy (book, chapter, verse) on data/bible_resolver.jsonl
+
+Usage: python benchmark.py [--backends t5 onnx classifier] [--limit 500]
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from aliases import ALIAS_TO_BOOK, BOOK_IDS
+from inference import load_backend, parse_model_output
+from procstats import peak_rss_mb, percentile, rss_mb
+
+ML_DIR = Path(__file__).parent
+DATA_PATH = ML_DIR / "data" / "bible_resolver.jsonl"
+
+# Requests timed per backend (unique transcripts, fixed sample)
+LIMIT = 500
+SEED = 0
+WARMUP = 5
+
+
+def load_samples(path: Path = DATA_PATH, limit: int = LIMIT) -> list[dict]:
+    """Unique transcripts from the dataset, sampled reproducibly"""
+    rows = {}
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            rows.setdefault(row["text"], row)
+    samples = list(rows.values())
+    random.Random(SEED).shuffle(samples)
+    return samples[:limit]
+
+
+def is_correct(ref: dict | None, row: dict) -> bool:
+    if not ref:
+        return False
+    book = row["book"] if row["book"] in BOOK_IDS else ALIAS_TO_BOOK.get(row["book"].lower())
+    return (ref["book"] == book
+            and ref["chapter"] == row["chapter"]
+            and ref["verse"] == row.get("verse"))
+
+
+def bench_backend(kind: str, limit: int) -> dict:
+    """Benchmark one backend in this process"""
+    samples = load_samples(limit=limit)
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    backend = load_backend(kind)
+    if backend is None:
+        return {"backend": kind, "error": "model not found"}
+    load_s = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    for row in samples[:WARMUP]:
+        backend.generate([row["text"]])
+
+    latencies = []
+    correct = 0
+    for row in samples:
+        t0 = time.perf_counter()
+        output = backend.generate([row["text"]])[0]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        correct += is_correct(parse_model_output(output), row)
+
+    return {
+        "backend": backend.name,
+        "samples": len(samples),
+        "loadSeconds": round(load_s, 2),
+        "modelRssMb": round(loaded_rss - base_rss, 1),
+        "rssMb": round(rss_mb(), 1),
+        "peakRssMb": round(peak_rss_mb(), 1),
+        "p50Ms": round(percentile(latencies, 0.50), 2),
+        "p99Ms": round(percentile(latencies, 0.99), 2),
+        "meanMs": round(sum(latencies) / len(latencies), 2),
+        "accuracy": round(correct / len(samples), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--backends", nargs="+", default=["t5", "onnx", "classifier"])
+    parser.add_argument("--limit", type=int, default=LIMIT)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(bench_backend(args.child, args.limit)))
+        return
+
+    results = []
+    for kind in args.backends:
+        print(f"⏱️ Benchmarking {kind}...")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", kind, "--limit", str(args.limit)],
+            capture_output=True, text=True, cwd=ML_DIR,
+        )
+        if proc.returncode != 0:
+            print(f"❌ {kind} failed:\n{proc.stderr}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'backend':<8} {'load s':>7} {'RSS MB':>8} {'peak MB':>8} {'p50 ms':>8} {'p99 ms':>8} {'acc':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<8} {r['error']}")
+            continue
+        print(f"{r['backend']:<8} {r['loadSeconds']:>7} {r['rssMb']:>8} {r['peakRssMb']:>8} "
+              f"{r['p50Ms']:>8} {r['p99Ms']:>8} {r['accuracy']:>7.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Memoization Layer for Pure Resolver Functions
+Bounded LRU caches shared by normalize / state_machine / session / resolver
+
+Live ASR re-sends the same strings constantly (partial re-emissions,
+"next", "verse 5"), so repeated phrases become a dictionary lookup.
+All caches are registered here so they can be inspected and cleared
+together, e.g. after the alias tables change.
+"""
+from functools import lru_cache
+from typing import Callable
+
+# Max entries per cached function
+CACHE_SIZE = 4096
+
+# name -> lru_cache wrapper
+_registry: dict[str, Callable] = {}
+
+
+def memoize(fn: Callable = None, *, maxsize: int = CACHE_SIZE):
+    """
+    Wrap a pure function in a bounded LRU cache and register it.
+    Usable as @memoize or @memoize(maxsize=...).
+    Cached return values are shared, so they must be immutable.
+    """
+    def decorate(f: Callable) -> Callable:
+        cached = lru_cache(maxsize=maxsize)(f)
+        _registry[f"{f.__module__}.{f.__qualname__}"] = cached
+        return cached
+
+    if fn is not None:
+        return decorate(fn)
+    return decorate
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for every registered cache"""
+    stats = {}
+    for name, cached in _registry.items():
+        info = cached.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hitRate": round(info.hits / lookups, 4) if lookups else 0.0,
+        }
+    return stats
+
+
+def clear_caches():
+    """Drop all cached results and reset counters"""
+    for cached in _registry.values():
+        cached.cache_clear()
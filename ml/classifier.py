@@ -0,0 +1,125 @@
+"""
+Reference Classifier
+Compact encoder-only alternative to the seq2seq T5 resolver
+
+One forward pass of a small BERT encoder; the [CLS] vector feeds
+  - a book head (66 classes, in BOOK_IDS order)
+  - chapter / verse digit heads: hundreds, tens, ones (10 classes each)
+Numbers are predicted digit by digit so rare chapters (Psalm 119) share
+what the model learns about common ones. A verse of 000 means "no verse".
+
+Trained by `python train.py classifier`; served by inference.ClassifierBackend.
+"""
+import json
+from pathlib import Path
+
+import torch
+from torch import nn
+from transformers import AutoModel, AutoTokenizer
+
+from aliases import BOOK_IDS, ALIAS_TO_BOOK
+
+# ~11M parameters vs ~60M for t5-small
+BASE_MODEL = "google/bert_uncased_L-4_H-256_A-4"
+
+# Digits per number field (hundreds, tens, ones)
+DIGITS = 3
+
+BOOKS = list(BOOK_IDS)
+
+HEADS_FILE = "heads.pt"
+CONFIG_FILE = "classifier.json"
+
+
+def encode_number(value: int | None) -> list[int]:
+    """17 → [0, 1, 7]; None → [0, 0, 0]"""
+    return [int(d) for d in f"{value or 0:0{DIGITS}d}"[-DIGITS:]]
+
+
+def decode_number(digits: list[int]) -> int | None:
+    value = int("".join(str(d) for d in digits))
+    return value or None
+
+
+def book_index(name: str) -> int:
+    """Head class for a dataset label ("Psalm" → Psalms)"""
+    book = name if name in BOOK_IDS else ALIAS_TO_BOOK[name.lower()]
+    return BOOK_IDS[book]
+
+
+class ReferenceClassifier(nn.Module):
+    """Encoder + book / chapter-digit / verse-digit heads"""
+
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+        hidden = encoder.config.hidden_size
+        self.dropout = nn.Dropout(0.1)
+        self.book = nn.Linear(hidden, len(BOOKS))
+        self.chapter = nn.Linear(hidden, DIGITS * 10)
+        self.verse = nn.Linear(hidden, DIGITS * 10)
+
+    def forward(self, input_ids, attention_mask, book=None, chapter=None, verse=None):
+        hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        pooled = self.dropout(hidden[:, 0])
+        logits = {
+            "book": self.book(pooled),
+            "chapter": self.chapter(pooled).view(-1, DIGITS, 10),
+            "verse": self.verse(pooled).view(-1, DIGITS, 10),
+        }
+        if book is None:
+            return logits
+
+        loss_fn = nn.CrossEntropyLoss()
+        loss = (
+            loss_fn(logits["book"], book)
+            + loss_fn(logits["chapter"].reshape(-1, 10), chapter.reshape(-1))
+            + loss_fn(logits["verse"].reshape(-1, 10), verse.reshape(-1))
+        )
+        return loss, logits
+
+    @torch.inference_mode()
+    def predict(self, input_ids, attention_mask) -> list[str]:
+        """Outputs in the T5 label format: "Book|chapter|verse" """
+        logits = self.forward(input_ids, attention_mask)
+        books = logits["book"].argmax(-1).tolist()
+        chapters = logits["chapter"].argmax(-1).tolist()
+        verses = logits["verse"].argmax(-1).tolist()
+
+        outputs = []
+        for book, chapter, verse in zip(books, chapters, verses):
+            chapter = decode_number(chapter)
+            verse = decode_number(verse)
+            outputs.append(f"{BOOKS[book]}|{chapter or ''}|{verse or ''}")
+        return outputs
+
+    @classmethod
+    def from_base(cls, base: str = BASE_MODEL) -> "ReferenceClassifier":
+        return cls(AutoModel.from_pretrained(base))
+
+    def save(self, path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        self.encoder.save_pretrained(str(path))
+        heads = {k: v for k, v in self.state_dict().items() if not k.startswith("encoder.")}
+        torch.save(heads, path / HEADS_FILE)
+        (path / CONFIG_FILE).write_text(json.dumps({"books": BOOKS, "digits": DIGITS}))
+
+    @classmethod
+    def load(cls, path: Path) -> "ReferenceClassifier":
+        config = json.loads((path / CONFIG_FILE).read_text())
+        if config["books"] != BOOKS:
+            raise ValueError(f"{path} was trained with a different book list")
+        model = cls(AutoModel.from_pretrained(str(path)))
+        # Encoder weights come from save_pretrained; the heads file must
+        # hold every other parameter, or the heads would stay random
+        result = model.load_state_dict(torch.load(path / HEADS_FILE, map_location="cpu"), strict=False)
+        missing = [k for k in result.missing_keys if not k.startswith("encoder.")]
+        if missing or result.unexpected_keys:
+            raise ValueError(f"{path / HEADS_FILE} doesn't match the model: "
+                             f"missing {missing}, unexpected {result.unexpected_keys}")
+        model.eval()
+        return model
+
+
+def load_tokenizer(path_or_name):
+    return AutoTokenizer.from_pretrained(str(path_or_name), use_fast=True)
@@ -4,8 +4,26 @@ Simulates common speech recognition errors:
 - Character-level misspellings
 - Word splitting (ASR tokenization errors)
 - Accent/pronunciation variations
+- Phonetic confusions (sounds ASR mixes up)
+
+Augmenter matches every substitution rule against a whole batch of phrases
+at once: the batch becomes one numpy array of code points, rules are
+grouped by first character and found with array comparisons, and every
+random decision for the batch is drawn in a few vectorized calls, so
+output is deterministic for a seeded Generator.
+
+Substitution is a single pass over the original text, each rule firing at
+most on its first occurrence in a phrase. Unlike the old table-by-table
+str.replace chain, one edit never feeds another (an accent rule cannot
+rewrite text a character rule just produced), and overlapping edits keep
+the earliest, then longest, pattern.
 """
-import random
+import re
+from dataclasses import dataclass
+from itertools import chain
+from typing import Iterable, Optional
+
+import numpy as np
 
 # Character-level noise (common ASR mistakes)
 CHAR_NOISE = {
@@ -22,30 +40,6 @@ CHAR_NOISE = {
     "tion": ["shun", "sion"],
 }
 
-def misspell(text: str) -> str:
-    """Apply character-level noise to simulate ASR errors"""
-    t = text
-    for k, v in CHAR_NOISE.items():
-        if k in t and random.random() < 0.4:
-            t = t.replace(k, random.choice(v), 1)
-    return t
-
-
-def split_words(text: str) -> str:
-    """Randomly split words to simulate ASR tokenization errors"""
-    words = text.split()
-    out = []
-
-    for w in words:
-        if len(w) > 4 and random.random() < 0.3:
-            split = random.randint(2, len(w) - 2)
-            out.append(w[:split])
-            out.append(w[split:])
-        else:
-            out.append(w)
-
-    return " ".join(out)
-
 
 # Accent/pronunciation variations
 ACCENT_MAP = {
@@ -58,14 +52,6 @@ ACCENT_MAP = {
     "j": ["g"],
 }
 
-def accent_noise(text: str) -> str:
-    """Apply accent/pronunciation variations"""
-    t = text
-    for k, v in ACCENT_MAP.items():
-        if k in t and random.random() < 0.3:
-            t = t.replace(k, random.choice(v), 1)
-    return t
-
 
 # Word-level variations (homophones, common mishearings)
 WORD_NOISE = {
@@ -84,33 +70,198 @@ WORD_NOISE = {
     "verse": ["vers", "versh"],
 }
 
-def word_noise(text: str) -> str:
-    """Apply word-level noise for common mishearings"""
-    t = text
-    for k, v in WORD_NOISE.items():
-        if k in t and random.random() < 0.25:
-            t = t.replace(k, random.choice(v), 1)
-    return t
+# Phonetic confusion sets: any member may be heard as any other
+PHONETIC_CONFUSIONS = [
+    ("b", "v"),
+    ("d", "t"),
+    ("f", "ph"),
+    ("k", "c"),
+    ("m", "n"),
+    ("ee", "ea", "ie"),
+    ("ai", "ay", "ei"),
+]
+
+
+@dataclass
+class AugmentConfig:
+    """Probabilities for each kind of noise"""
+    char_prob: float = 0.4        # CHAR_NOISE rules
+    word_prob: float = 0.25       # WORD_NOISE rules
+    accent_prob: float = 0.3      # ACCENT_MAP rules
+    confusion_prob: float = 0.1   # PHONETIC_CONFUSIONS
+    split_prob: float = 0.3       # split a word in two
+    min_split_length: int = 5     # only words this long are split
+    # Per-pattern overrides, e.g. {"h": 0.1}
+    rule_probs: Optional[dict[str, float]] = None
+    confusions: tuple = tuple(PHONETIC_CONFUSIONS)
+
+
+class Augmenter:
+    """
+    All substitution rules compiled once, applied to a whole batch at once.
+
+    The batch is joined into one code-point array. Each rule fires at most
+    once per phrase (on its first occurrence) with its probability; rule
+    occurrences are found with array comparisons over the whole batch,
+    grouped by first character, and every random decision is drawn in bulk.
+    Overlapping edits keep the earliest (then longest) pattern. Words are
+    then split at random positions the same way.
+    """
+
+    def __init__(self, config: Optional[AugmentConfig] = None):
+        self.config = config or AugmentConfig()
+        c = self.config
+
+        rules: dict[str, tuple[list[str], float]] = {}
+
+        def add(pattern: str, choices, prob: float):
+            old_choices, old_prob = rules.get(pattern, ([], 0.0))
+            merged = old_choices + [x for x in choices if x not in old_choices and x != pattern]
+            rules[pattern] = (merged, max(old_prob, prob))
+
+        for table, prob in ((CHAR_NOISE, c.char_prob), (WORD_NOISE, c.word_prob),
+                            (ACCENT_MAP, c.accent_prob)):
+            for pattern, choices in table.items():
+                add(pattern, choices, prob)
+        for group in c.confusions:
+            for pattern in group:
+                add(pattern, group, c.confusion_prob)
+        for pattern, prob in (c.rule_probs or {}).items():
+            if pattern in rules:
+                rules[pattern] = (rules[pattern][0], prob)
+
+        self.patterns = list(rules)
+        self._choices = [rules[p][0] for p in self.patterns]
+        self._probs = np.array([rules[p][1] for p in self.patterns])
+        self._n_choices = np.array([len(ch) for ch in self._choices])
+        self._lengths = np.array([len(p) for p in self.patterns])
+
+        # Compiled matcher: rules grouped by first character, each as an
+        # array of the code points that must follow
+        self._by_first: dict[int, list[tuple[int, np.ndarray]]] = {}
+        for rule, pattern in enumerate(self.patterns):
+            codes = _codes(pattern)
+            self._by_first.setdefault(int(codes[0]), []).append((rule, codes[1:]))
+
+    def augment(self, phrases: Iterable[str], rng: np.random.Generator) -> list[str]:
+        """Noisy version of every phrase (same order)"""
+        texts = list(phrases)
+        if not texts:
+            return []
+        # One phrase per line, single-spaced
+        batch = "\n".join(texts)
+        if batch.count("\n") != len(texts) - 1:
+            batch = "\n".join(" ".join(t.split()) for t in texts)
+        batch = _clean_spaces(batch.lower())
+
+        batch = self._substitute(batch, rng)
+        batch = self._split(batch, rng)
+        # Edits can leave stray spaces (e.g. a word deleted outright)
+        return _clean_spaces(batch).split("\n")
+
+    def _find_first(self, chars: np.ndarray, starts: np.ndarray):
+        """(positions, rule ids) of each rule's first occurrence per phrase"""
+        n = len(chars)
+        found_pos, found_rule = [], []
+        for first, rules in self._by_first.items():
+            candidates = np.flatnonzero(chars == first)
+            if not len(candidates):
+                continue
+            for rule, rest in rules:
+                pos = candidates[candidates + len(rest) < n] if len(rest) else candidates
+                for j, code in enumerate(rest, 1):
+                    pos = pos[chars[pos + j] == code]
+                if not len(pos):
+                    continue
+                phrase = np.searchsorted(starts, pos, side="right")
+                first_in_phrase = np.r_[True, phrase[1:] != phrase[:-1]]
+                pos = pos[first_in_phrase]
+                found_pos.append(pos)
+                found_rule.append(np.full(len(pos), rule, dtype=np.intp))
+        if not found_pos:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.concatenate(found_pos), np.concatenate(found_rule)
+
+    def _substitute(self, batch: str, rng: np.random.Generator) -> str:
+        chars = _codes(batch)
+        starts = np.flatnonzero(chars == _NEWLINE)
+        pos, rule = self._find_first(chars, starts)
+        if not len(pos):
+            return batch
+
+        # Every decision for the whole batch in two draws
+        fire = rng.random(len(pos)) < self._probs[rule]
+        picks = (rng.random(len(pos)) * self._n_choices[rule]).astype(np.intp)
+        pos, rule, picks = pos[fire], rule[fire], picks[fire]
+
+        # Earliest edit first, the longest pattern winning a tie; an edit
+        # overlapping any earlier one is skipped
+        lengths = self._lengths[rule]
+        order = np.lexsort((-lengths, pos))
+        pos, rule, picks, ends = pos[order], rule[order], picks[order], (pos + lengths)[order]
+        keep = np.r_[True, pos[1:] >= np.maximum.accumulate(ends)[:-1]]
+        pos, rule, picks, ends = pos[keep], rule[keep], picks[keep], ends[keep]
+
+        choices = self._choices
+        replacements = [choices[r][k] for r, k in zip(rule.tolist(), picks.tolist())]
+        gaps = [batch[a:b] for a, b in zip([0] + ends.tolist(), pos.tolist() + [len(batch)])]
+        return "".join(chain.from_iterable(zip(gaps, replacements))) + gaps[-1]
+
+    def _split(self, batch: str, rng: np.random.Generator) -> str:
+        chars = _codes(batch)
+        space = (chars == _SPACE) | (chars == _NEWLINE)
+        word = ~space
+        word_starts = np.flatnonzero(word & np.r_[True, space[:-1]])
+        word_ends = np.flatnonzero(word & np.r_[space[1:], True]) + 1
+        lengths = word_ends - word_starts
+
+        split = (lengths >= self.config.min_split_length) & (rng.random(len(lengths)) < self.config.split_prob)
+        # Split point in [2, len - 2], never leaving a 1-letter piece
+        at = 2 + (rng.random(len(lengths)) * np.maximum(lengths - 3, 1)).astype(np.intp)
+        if not split.any():
+            return batch
+        chars = np.insert(chars, (word_starts + at)[split], _SPACE)
+        return chars.tobytes().decode("utf-32-le")
+
+    def variants(self, text: str, n: int, rng: np.random.Generator) -> list[str]:
+        """The clean text plus up to n - 1 distinct noisy variants"""
+        noisy = self.augment([text] * (n - 1), rng)
+        return list(dict.fromkeys([text.lower()] + noisy))
+
+
+_SPACE = ord(" ")
+_NEWLINE = ord("\n")
+_WHITESPACE_RE = re.compile(r"[^\S\n]+")
+_EDGE_SPACES_RE = re.compile(r" ?\n ?")
+
+
+def _clean_spaces(batch: str) -> str:
+    """Single spaces inside lines, none at line ends (regex only if needed)"""
+    if "  " in batch or "\t" in batch or "\r" in batch or "\f" in batch or "\v" in batch:
+        batch = _WHITESPACE_RE.sub(" ", batch)
+    if " \n" in batch or "\n " in batch:
+        batch = _EDGE_SPACES_RE.sub("\n", batch)
+    return batch.strip(" ")
+
+
+def _codes(text: str) -> np.ndarray:
+    """One uint32 code point per character"""
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+# Default engine and RNG for one-off calls
+AUGMENTER = Augmenter()
+_rng = np.random.default_rng()
 
 
-def corrupt(text: str) -> str:
+def corrupt(text: str, rng: Optional[np.random.Generator] = None) -> str:
     """Apply all noise transformations to simulate real ASR output"""
-    t = text.lower()
-    t = misspell(t)
-    t = word_noise(t)
-    t = split_words(t)
-    t = accent_noise(t)
-    # Clean up double spaces
-    t = " ".join(t.split())
-    return t
+    return AUGMENTER.augment([text], rng or _rng)[0]
 
 
-def generate_variants(text: str, n: int = 5) -> list[str]:
-    """Generate n corrupted variants of a clean text"""
-    variants = [text.lower()]  # Include clean version
-    for _ in range(n - 1):
-        variants.append(corrupt(text))
-    return list(set(variants))  # Remove duplicates
+def generate_variants(text: str, n: int = 5, rng: Optional[np.random.Generator] = None) -> list[str]:
+    """Generate n corrupted variants of a clean text (duplicates removed)"""
+    return AUGMENTER.variants(text, n, rng or _rng)
 
 
 if __name__ == "__main__":
@@ -122,8 +273,9 @@ if __name__ == "__main__":
         "psalm twenty three",
     ]
     
+    rng = np.random.default_rng(0)
     for phrase in test_phrases:
         print(f"\nOriginal: {phrase}")
         print("Variants:")
-        for v in generate_variants(phrase, 5):
+        for v in generate_variants(phrase, 5, rng):
             print(f"  - {v}")
@@ -1,13 +1,39 @@
 """
 Training Data Generator for Bible Reference Resolver
 Generates synthetic spoken phrases with augmentation for ASR noise
+
+Generation is split into shards, each with its own seed (derived from
+--seed), run across worker processes:
+  1. every shard streams its rows into per-bucket part files, the bucket
+     chosen by the row's content hash
+  2. every bucket is deduplicated on its own (so memory is bounded by one
+     bucket, never the corpus) and written as one output shard
+The same --seed and --shards always give the same files, however many
+workers run. References stay within real chapter/verse counts.
+
+  python generate.py                                  # bible_resolver.jsonl
+  python generate.py --format parquet                 # bible_resolver.parquet
+  python generate.py --base 1000000 --out-shards 16 --out corpus/
 """
+import argparse
+import hashlib
+import importlib.util
 import json
 import random
+import shutil
+import sys
+from multiprocessing import Pool
 from pathlib import Path
 
+import numpy as np
+
 # Import augmentation
-from augment import corrupt, generate_variants
+from augment import AUGMENTER
+
+# ml/ modules (versification, aliases)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aliases import ALIAS_TO_BOOK
+from versification import VERSES, chapter_count, verse_count
 
 BOOKS = {
     "Genesis": ["genesis"],
@@ -78,6 +104,8 @@ BOOKS = {
     "Revelation": ["revelation", "revelations"],
 }
 
+BOOK_ITEMS = list(BOOKS.items())
+
 TEMPLATES = [
     # Simple references
     "{book} {chapter}",
@@ -108,15 +136,22 @@ TEMPLATES = [
 ]
 
 
-def generate_clean_example():
+def canonical_book(label: str) -> str:
+    """Versification name for a label ("Psalm" → "Psalms")"""
+    return label if label in VERSES else ALIAS_TO_BOOK[label.lower()]
+
+
+def generate_clean_example(rng=random):
     """Generate a single clean training example"""
-    book, aliases = random.choice(list(BOOKS.items()))
-    alias = random.choice(aliases)
-    
-    chapter = random.randint(1, 30)
-    verse = random.choice([None, random.randint(1, 35)])
-    
-    template = random.choice(TEMPLATES)
+    book, aliases = rng.choice(BOOK_ITEMS)
+    alias = rng.choice(aliases)
+
+    # Only references that exist
+    canonical = canonical_book(book)
+    chapter = rng.randint(1, chapter_count(canonical))
+    verse = rng.choice([None, rng.randint(1, verse_count(canonical, chapter))])
+
+    template = rng.choice(TEMPLATES)
     
     text = template.format(
         book=alias,
@@ -135,36 +170,48 @@ def generate_clean_example():
     }
 
 
-def generate_examples(clean_text: str, label: dict, n: int = 5) -> list[dict]:
+def generate_examples(clean_text: str, label: dict, n: int = 5,
+                      noise_rng: np.random.Generator | None = None) -> list[dict]:
     """Generate multiple corrupted variants of a clean example"""
-    rows = []
-    for _ in range(n):
-        rows.append({
-            "text": corrupt(clean_text),
-            **label
-        })
-    return rows
+    noise_rng = noise_rng or np.random.default_rng()
+    return [{"text": text, **label} for text in AUGMENTER.augment([clean_text] * n, noise_rng)]
 
 
-def generate_dataset(n_base: int = 1000, variants_per_example: int = 5) -> list[dict]:
-    """Generate full training dataset with augmentation"""
+# Clean examples augmented together in one Augmenter call
+AUGMENT_BATCH = 1000
+
+
+def iter_rows(n_base: int, variants_per_example: int = 5, rng=random,
+              noise_rng: np.random.Generator | None = None):
+    """Stream clean examples, each followed by its corrupted variants"""
+    noise_rng = noise_rng or np.random.default_rng()
+    for start in range(0, n_base, AUGMENT_BATCH):
+        examples = [generate_clean_example(rng) for _ in range(min(AUGMENT_BATCH, n_base - start))]
+        noisy = AUGMENTER.augment(
+            (e["text"] for e in examples for _ in range(variants_per_example)), noise_rng
+        )
+        for i, example in enumerate(examples):
+            label = {
+                "book": example["book"],
+                "chapter": example["chapter"],
+                "verse": example["verse"]
+            }
+            yield example
+            for text in noisy[i * variants_per_example:(i + 1) * variants_per_example]:
+                yield {"text": text, **label}
+
+
+def generate_dataset(n_base: int = 1000, variants_per_example: int = 5, seed: int | None = None) -> list[dict]:
+    """Generate full training dataset in memory (duplicates removed)"""
+    rng = random.Random(seed)
+    noise_rng = np.random.default_rng(seed)
+    seen = set()
     rows = []
-    
-    for _ in range(n_base):
-        example = generate_clean_example()
-        clean_text = example["text"]
-        label = {
-            "book": example["book"],
-            "chapter": example["chapter"],
-            "verse": example["verse"]
-        }
-        
-        # Add clean version
-        rows.append(example)
-        
-        # Add corrupted variants
-        rows.extend(generate_examples(clean_text, label, variants_per_example))
-    
+    for row in iter_rows(n_base, variants_per_example, rng, noise_rng):
+        digest = row_digest(json.dumps(row))
+        if digest not in seen:
+            seen.add(digest)
+            rows.append(row)
     return rows
 
 
@@ -176,15 +223,155 @@ def save_dataset(rows: list[dict], path: str = "bible_resolver.jsonl"):
     print(f"✅ Saved {len(rows)} examples to {path}")
 
 
-if __name__ == "__main__":
+# ─── Sharded streaming generation ───
+
+def row_digest(line: str) -> int:
+    """64-bit content hash of a serialized row"""
+    return int.from_bytes(hashlib.blake2b(line.encode(), digest_size=8).digest(), "little")
+
+
+def shard_seed(seed: int, shard: int) -> str:
+    """Independent, reproducible seed per shard"""
+    return f"{seed}:{shard}"
+
+
+def shard_noise_rng(seed: int, shard: int) -> np.random.Generator:
+    """Independent, reproducible augmentation stream per shard"""
+    return np.random.default_rng([seed, shard])
+
+
+def _generate_shard(args) -> int:
+    """Phase 1: stream one shard's rows into per-bucket part files"""
+    shard, n_base, variants, seed, n_buckets, work_dir = args
+    rng = random.Random(shard_seed(seed, shard))
+    noise_rng = shard_noise_rng(seed, shard)
+    parts = [open(work_dir / f"part-{shard:05d}-{b:05d}.jsonl", "w") for b in range(n_buckets)]
+    count = 0
+    try:
+        for row in iter_rows(n_base, variants, rng, noise_rng):
+            line = json.dumps(row)
+            parts[row_digest(line) % n_buckets].write(line + "\n")
+            count += 1
+    finally:
+        for f in parts:
+            f.close()
+    return count
+
+
+def _write_bucket(args) -> int:
+    """Phase 2: drop duplicate rows within one bucket, write one output shard"""
+    bucket, n_shards, work_dir, output, fmt = args
+    seen = set()
+    with open(output, "w") if fmt == "jsonl" else _ParquetWriter(output) as out:
+        for shard in range(n_shards):
+            with open(work_dir / f"part-{shard:05d}-{bucket:05d}.jsonl") as f:
+                for line in f:
+                    digest = row_digest(line.rstrip("\n"))
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    out.write(line)
+    return len(seen)
+
+
+class _ParquetWriter:
+    """File-like adapter: JSONL lines in, Parquet row groups out"""
+    ROW_GROUP = 65536
+
+    def __init__(self, path: Path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("text", pa.string()), ("book", pa.string()),
+            ("chapter", pa.int32()), ("verse", pa.int32()),
+        ])
+        self._writer = pq.ParquetWriter(str(path), self._schema)
+        self._rows = []
+
+    def write(self, line: str):
+        self._rows.append(json.loads(line))
+        if len(self._rows) >= self.ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._flush()
+        self._writer.close()
+
+
+def generate_sharded(n_base: int, variants: int, seed: int, shards: int,
+                     out_shards: int, workers: int, out: Path, fmt: str = "jsonl") -> list[Path]:
+    """Generate, deduplicate and write the corpus; returns output files"""
+    if out_shards == 1 and out.suffix:
+        outputs = [out]
+        work_dir = out.parent / f".{out.stem}-parts"
+    else:
+        out.mkdir(parents=True, exist_ok=True)
+        outputs = [out / f"bible_resolver-{b:05d}-of-{out_shards:05d}.{fmt}" for b in range(out_shards)]
+        work_dir = out / ".parts"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+
+    # Spread the base examples evenly over the shards
+    per_shard = [n_base // shards + (1 if i < n_base % shards else 0) for i in range(shards)]
+
+    with Pool(workers) as pool:
+        generated = sum(pool.map(_generate_shard, [
+            (i, per_shard[i], variants, seed, out_shards, work_dir) for i in range(shards)
+        ]))
+        kept = sum(pool.map(_write_bucket, [
+            (b, shards, work_dir, outputs[b], fmt) for b in range(out_shards)
+        ]))
+
+    shutil.rmtree(work_dir)
+    print(f"✅ Generated {generated} rows, kept {kept} unique ({generated - kept} duplicates)")
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Bible reference training data")
+    parser.add_argument("--base", type=int, default=1000, help="clean examples")
+    parser.add_argument("--variants", type=int, default=5, help="corrupted variants per example")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=16, help="generation tasks (fixes the output for a seed)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--out-shards", type=int, default=1, help="output files")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="file, or directory for --out-shards (default: bible_resolver.<format>)")
+    args = parser.parse_args()
+    if args.out is None:
+        args.out = Path(__file__).parent / f"bible_resolver.{args.format}"
+    elif args.out_shards == 1 and args.out.suffix and args.out.suffix != f".{args.format}":
+        parser.error(f"--out {args.out} doesn't match --format {args.format}")
+    # Fail now rather than in every worker after the generation pass
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--format parquet needs pyarrow (pip install pyarrow)")
+
     print("🎲 Generating training data...")
-    
-    # Generate 1000 base examples × 6 variants each = 6000 training examples
-    data = generate_dataset(n_base=1000, variants_per_example=5)
-    
-    save_dataset(data, "bible_resolver.jsonl")
-    
+    outputs = generate_sharded(
+        args.base, args.variants, args.seed, args.shards,
+        args.out_shards, args.workers, args.out, args.format,
+    )
+    print(f"📁 {len(outputs)} file(s): {outputs[0]}{' ...' if len(outputs) > 1 else ''}")
+
     # Show some examples
-    print("\n📋 Sample examples:")
-    for row in random.sample(data, 5):
-        print(f"  '{row['text']}' → {row['book']} {row['chapter']}:{row['verse']}")
+    if args.format == "jsonl":
+        with open(outputs[0]) as f:
+            sample = [json.loads(line) for _, line in zip(range(5), f)]
+        print("\n📋 Sample examples:")
+        for row in sample:
+            print(f"  '{row['text']}' → {row['book']} {row['chapter']}:{row['verse']}")
+
+
+if __name__ == "__main__":
+    main()
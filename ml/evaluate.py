@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Resolver Evaluation
+Accuracy and latency of every resolution strategy on the same labeled data
+
+Streams a labeled JSONL file ({"text", "book", "chapter", "verse"} per line)
+through each strategy, one transcript at a time as the server sees them:
+  resolve    resolver.resolve (parse → spans → substring → fallback)
+  extract    normalize.extract_reference on its own
+  session    SessionManager.process_utterance, then ReferenceTracker.update
+             (the server's per-room path; fresh state for every row)
+  model      an inference backend (--backend, default the best available)
+
+Reports exact-match accuracy per field, a per-book confusion matrix,
+throughput and p50/p95/p99 latency; --json writes everything for CI and
+--baseline fails (exit 1) if accuracy or p99 latency regressed.
+
+Usage: python evaluate.py [--data FILE] [--strategies resolve session ...]
+                          [--limit N] [--json out.json] [--baseline old.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from aliases import ALIAS_TO_BOOK, BOOK_IDS
+from cache import clear_caches
+from procstats import percentile
+
+ML_DIR = Path(__file__).parent
+DATA_PATH = ML_DIR / "data" / "bible_resolver.jsonl"
+
+FIELDS = ("book", "chapter", "verse")
+
+# Regression thresholds for --baseline
+ACCURACY_TOLERANCE = 0.005   # absolute drop in exact-match accuracy
+LATENCY_TOLERANCE = 0.5      # relative rise in p99 latency
+
+# Predicted book for rows a strategy left unresolved
+NO_ANSWER = "-"
+
+
+def iter_rows(path: Path, limit: Optional[int] = None) -> Iterator[dict]:
+    """Labeled rows, streamed (book labels made canonical)"""
+    with open(path) as f:
+        count = 0
+        for line in f:
+            if limit is not None and count >= limit:
+                return
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            book = row["book"]
+            row["book"] = book if book in BOOK_IDS else ALIAS_TO_BOOK.get(book.lower(), book)
+            row.setdefault("verse", None)
+            count += 1
+            yield row
+
+
+# ─── Strategies: each factory returns text → reference dict (or None) ───
+
+def resolve_strategy() -> Callable[[str], Optional[dict]]:
+    from resolver import resolve
+    return resolve
+
+
+def extract_strategy() -> Callable[[str], Optional[dict]]:
+    from normalize import extract_reference
+    return extract_reference
+
+
+def session_strategy() -> Callable[[str], Optional[dict]]:
+    from session import SessionManager
+    from state_machine import ReferenceTracker
+    from timers import TimerWheel
+    from utterance import parse_utterance
+
+    # Private wheel that is never advanced: chapter timers never fire
+    wheel = TimerWheel(clock=lambda: 0.0)
+
+    def run(text: str) -> Optional[dict]:
+        manager = SessionManager(timers=wheel)
+        utterance = parse_utterance(text)
+        result = manager.process_utterance(utterance)
+        manager.close()
+        if result and result.get("book"):
+            return result
+        return ReferenceTracker().update(utterance)
+
+    return run
+
+
+def model_strategy(kind: str = "auto") -> Callable[[str], Optional[dict]]:
+    from inference import load_backend, parse_model_output
+
+    backend = load_backend(kind)
+    if backend is None:
+        raise RuntimeError(f"no {kind} model found")
+
+    def run(text: str) -> Optional[dict]:
+        return parse_model_output(backend.generate([text])[0])
+
+    return run
+
+
+STRATEGIES = {
+    "resolve": resolve_strategy,
+    "extract": extract_strategy,
+    "session": session_strategy,
+    "model": model_strategy,
+}
+
+
+# ─── Scoring ───
+
+class Scorecard:
+    """Running totals for one strategy"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.answered = 0
+        self.correct = Counter()
+        self.latencies: list[float] = []
+        # expected book → predicted book → count
+        self.confusion: dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, row: dict, ref: Optional[dict], ms: float):
+        self.rows += 1
+        self.latencies.append(ms)
+        predicted = ref or {}
+        if ref:
+            self.answered += 1
+        hits = [predicted.get(field) == row[field] for field in FIELDS]
+        for field, hit in zip(FIELDS, hits):
+            self.correct[field] += hit
+        self.correct["exact"] += all(hits)
+        self.confusion[row["book"]][predicted.get("book") or NO_ANSWER] += 1
+
+    def report(self, seconds: float) -> dict:
+        n = self.rows or 1
+        return {
+            "strategy": self.name,
+            "rows": self.rows,
+            "answered": round(self.answered / n, 4),
+            "accuracy": {k: round(self.correct[k] / n, 4) for k in (*FIELDS, "exact")},
+            "throughput": round(self.rows / seconds, 1) if seconds else None,
+            "latencyMs": {
+                "p50": round(percentile(self.latencies, 0.50), 4),
+                "p95": round(percentile(self.latencies, 0.95), 4),
+                "p99": round(percentile(self.latencies, 0.99), 4),
+                "mean": round(sum(self.latencies) / n, 4),
+                "max": round(max(self.latencies), 4),
+            } if self.latencies else {},
+            "confusion": {book: dict(counts) for book, counts in sorted(self.confusion.items())},
+        }
+
+
+def evaluate(name: str, run: Callable[[str], Optional[dict]], rows: Iterator[dict]) -> dict:
+    """Stream rows through one strategy"""
+    # Caches start cold so strategies are timed on equal terms
+    clear_caches()
+    card = Scorecard(name)
+    start = time.perf_counter()
+    # Strategies log with print; keep that out of the terminal
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        for row in rows:
+            t0 = time.perf_counter()
+            ref = run(row["text"])
+            card.add(row, ref, (time.perf_counter() - t0) * 1000)
+            sink.seek(0)
+            sink.truncate()
+    return card.report(time.perf_counter() - start)
+
+
+def top_confusions(report: dict, n: int = 5) -> list[tuple[str, str, int]]:
+    """Most frequent (expected, predicted) book mistakes"""
+    mistakes = [
+        (expected, predicted, count)
+        for expected, counts in report["confusion"].items()
+        for predicted, count in counts.items()
+        if predicted != expected
+    ]
+    return sorted(mistakes, key=lambda m: -m[2])[:n]
+
+
+def regressions(reports: list[dict], baseline: dict) -> list[str]:
+    """Accuracy drops / p99 rises beyond tolerance vs a previous --json run"""
+    previous = {r["strategy"]: r for r in baseline.get("strategies", [])}
+    problems = []
+    for report in reports:
+        old = previous.get(report["strategy"])
+        if not old:
+            continue
+        drop = old["accuracy"]["exact"] - report["accuracy"]["exact"]
+        if drop > ACCURACY_TOLERANCE:
+            problems.append(f"{report['strategy']}: exact accuracy "
+                            f"{old['accuracy']['exact']:.2%} → {report['accuracy']['exact']:.2%}")
+        old_p99, new_p99 = old["latencyMs"].get("p99"), report["latencyMs"].get("p99")
+        if old_p99 and new_p99 and new_p99 > old_p99 * (1 + LATENCY_TOLERANCE):
+            problems.append(f"{report['strategy']}: p99 {old_p99:.3f}ms → {new_p99:.3f}ms")
+    return problems
+
+
+def print_table(reports: list[dict]):
+    print(f"\n{'strategy':<9} {'rows':>6} {'book':>7} {'chap':>7} {'verse':>7} {'exact':>7} "
+          f"{'rows/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in reports:
+        acc, lat = r["accuracy"], r["latencyMs"]
+        print(f"{r['strategy']:<9} {r['rows']:>6} {acc['book']:>7.2%} {acc['chapter']:>7.2%} "
+              f"{acc['verse']:>7.2%} {acc['exact']:>7.2%} {r['throughput']:>9} "
+              f"{lat['p50']:>8.3f} {lat['p95']:>8.3f} {lat['p99']:>8.3f}")
+    for r in reports:
+        mistakes = top_confusions(r)
+        if mistakes:
+            print(f"\n🔀 {r['strategy']} - most confused books:")
+            for expected, predicted, count in mistakes:
+                print(f"  {expected} → {predicted}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--data", type=Path, default=DATA_PATH)
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES),
+                        default=["resolve", "extract", "session"])
+    parser.add_argument("--backend", default="auto", help="inference backend for the model strategy")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--json", type=Path, help="write the full report here")
+    parser.add_argument("--baseline", type=Path, help="fail on regressions against this report")
+    args = parser.parse_args()
+
+    reports = []
+    for name in args.strategies:
+        print(f"📏 Evaluating {name}...")
+        try:
+            run = STRATEGIES[name](args.backend) if name == "model" else STRATEGIES[name]()
+        except Exception as e:
+            print(f"❌ {name} unavailable: {e}")
+            continue
+        reports.append(evaluate(name, run, iter_rows(args.data, args.limit)))
+
+    print_table(reports)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "data": str(args.data),
+            "limit": args.limit,
+            "strategies": reports,
+        }, indent=2))
+        print(f"\n📁 Report written to {args.json}")
+
+    if args.baseline:
+        problems = regressions(reports, json.loads(args.baseline.read_text()))
+        for problem in problems:
+            print(f"❌ Regression: {problem}")
+        if problems:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
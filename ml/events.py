@@ -0,0 +1,170 @@
+"""
+Session Event Bus
+Async pub/sub between session managers and websocket clients
+
+Publishers (session emits, timer expiry, state machine fallback) push a
+payload to a room topic. It is serialized once and appended to each
+subscriber's bounded queue; every client drains its own queue. publish()
+may be called from any thread - events for a subscriber on another loop
+are handed over with call_soon_threadsafe.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import STAGE_SECONDS
+
+# Per-subscriber backlog; the oldest event is dropped when full
+QUEUE_SIZE = 64
+
+
+class Event:
+    """One published payload, serialized exactly once"""
+    __slots__ = ("topic", "payload", "message", "published_at")
+
+    def __init__(self, topic: str, payload: dict):
+        self.topic = topic
+        self.payload = payload
+        start = time.perf_counter()
+        self.message = json.dumps(payload)
+        self.published_at = time.perf_counter()
+        STAGE_SECONDS.observe("serialize", self.published_at - start)
+
+
+class Subscription:
+    """A subscriber's bounded queue; iterate with `async for`"""
+    __slots__ = (
+        "bus", "topic", "loop", "thread",
+        "_queue", "_ready", "coalesce", "dropped", "coalesced", "delivered",
+        "closed",
+    )
+
+    def __init__(self, bus: "EventBus", topic: str, maxsize: int,
+                 coalesce: bool = False):
+        self.bus = bus
+        self.topic = topic
+        # Latest-wins: a new event replaces everything still queued
+        self.coalesce = coalesce
+        # The loop (and its thread) that consumes this subscription
+        self.loop = asyncio.get_running_loop()
+        self.thread = threading.get_ident()
+        self._queue: deque[Event] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def oldest_age(self) -> float:
+        """Seconds the oldest queued event has been waiting"""
+        if not self._queue:
+            return 0.0
+        return time.perf_counter() - self._queue[0].published_at
+
+    def offer(self, event: Event):
+        """Enqueue from any thread"""
+        if threading.get_ident() == self.thread:
+            self.put(event)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.put, event)
+
+    def put(self, event: Event):
+        """Enqueue without blocking (consumer's loop thread only)"""
+        if self.closed:
+            return
+        if self.coalesce and self._queue:
+            self.coalesced += len(self._queue)
+            self._queue.clear()
+        elif len(self._queue) == self._queue.maxlen:
+            self.dropped += 1  # deque drops the oldest on append
+        self._queue.append(event)
+        self._ready.set()
+
+    async def get(self) -> Optional[Event]:
+        """Next event, or None once the subscription is closed"""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        self.delivered += 1
+        return self._queue.popleft()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def close(self):
+        """Unsubscribe and wake any pending get()"""
+        if not self.closed:
+            self.closed = True
+            self.bus.unsubscribe(self)
+            self._ready.set()
+
+
+class EventBus:
+    """Topic -> subscribers fan-out"""
+
+    def __init__(self, maxsize: int = QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._topics: dict[str, dict[Subscription, None]] = {}
+        # Guards _topics: publish() may run on any thread while the loop
+        # subscribes and unsubscribes
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topic: str, coalesce: bool = False) -> Subscription:
+        """Subscribe to a topic (must be called on the consuming loop)"""
+        sub = Subscription(self, topic, self.maxsize, coalesce)
+        with self._lock:
+            self._topics.setdefault(topic, {})[sub] = None
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._topics.get(sub.topic)
+            if subs is not None:
+                subs.pop(sub, None)
+                if not subs:
+                    del self._topics[sub.topic]
+
+    def subscribers(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+    def publish(self, topic: str, payload: dict) -> Optional[Event]:
+        """Publish a payload to every subscriber of topic"""
+        # Snapshot under the lock; offers happen outside it
+        with self._lock:
+            subs = list(self._topics.get(topic, ()))
+        if not subs:
+            return None
+        event = Event(topic, payload)
+        self.published += 1
+        for sub in subs:
+            sub.offer(event)
+        return event
+
+    def stats(self) -> dict:
+        with self._lock:
+            topics = len(self._topics)
+            subscribers = sum(len(s) for s in self._topics.values())
+        return {
+            "published": self.published,
+            "topics": topics,
+            "subscribers": subscribers,
+        }
+
+
+# Shared bus for this process
+BUS = EventBus()
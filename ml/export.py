@@ -0,0 +1,58 @@
+"""
+ONNX Export for the Bible Reference Resolver
+Converts the trained T5 model (train.py → model/) for CPU-only serving
+
+  1. Export encoder / decoder / decoder-with-past graphs to ONNX
+  2. Dynamic int8 quantization of every graph (weights int8, activations
+     quantized on the fly - no calibration data needed)
+  3. Save a fast (Rust) tokenizer alongside
+
+server.py prefers model-onnx/ when it exists (see inference.OnnxBackend).
+"""
+import shutil
+from pathlib import Path
+
+from transformers import T5TokenizerFast
+from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+MODEL_DIR = Path(__file__).parent / "model"
+ONNX_DIR = Path(__file__).parent / "model-onnx"
+
+# Graphs produced by the seq2seq export
+GRAPHS = ["encoder_model", "decoder_model", "decoder_with_past_model"]
+
+
+def export(model_dir: Path = MODEL_DIR, output_dir: Path = ONNX_DIR):
+    if not (model_dir / "config.json").exists():
+        raise SystemExit(f"❌ No trained model in {model_dir} - run train.py first")
+
+    staging = output_dir.with_name(output_dir.name + "-fp32")
+    print(f"📦 Exporting {model_dir} to ONNX...")
+    model = ORTModelForSeq2SeqLM.from_pretrained(str(model_dir), export=True)
+    model.save_pretrained(str(staging))
+
+    print("🔢 Quantizing (dynamic int8)...")
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for graph in GRAPHS:
+        onnx_file = staging / f"{graph}.onnx"
+        if not onnx_file.exists():
+            continue
+        quantizer = ORTQuantizer.from_pretrained(str(staging), file_name=onnx_file.name)
+        quantizer.quantize(save_dir=str(output_dir), quantization_config=qconfig)
+        print(f"  ✓ {graph}")
+
+    # Configs (generation settings etc.) travel with the graphs
+    for f in staging.glob("*.json"):
+        shutil.copy(f, output_dir / f.name)
+
+    print("🔤 Saving fast tokenizer...")
+    tokenizer = T5TokenizerFast.from_pretrained(str(model_dir))
+    tokenizer.save_pretrained(str(output_dir))
+
+    shutil.rmtree(staging)
+    print(f"✅ Quantized ONNX model saved to {output_dir}")
+
+
+if __name__ == "__main__":
+    export()
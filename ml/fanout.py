@@ -0,0 +1,134 @@
+"""
+Websocket Fan-out
+Per-client senders that drain room subscriptions independently
+
+Every client has its own bounded, latest-wins queue (see events.py) and
+drain task, so a stalled projector never delays other screens. A client
+whose send stalls or whose oldest update grows too old is disconnected.
+Per-client lag is tracked from publish to completed send.
+"""
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import WebSocket
+
+from events import Subscription
+from metrics import STAGE_SECONDS
+
+# A single send may block this long before the client is dropped
+SEND_TIMEOUT = 2.0
+
+# Drop a client whose next update has waited longer than this
+MAX_LAG = 5.0
+
+# Close code for evicted clients ("try again later")
+EVICT_CODE = 1013
+
+# Smoothing factor for the average lag
+LAG_ALPHA = 0.2
+
+
+class ClientSender:
+    """Drains one client's subscription to its websocket"""
+    __slots__ = (
+        "client_id", "ws", "sub", "task", "connected_at",
+        "sent", "last_lag", "avg_lag", "max_lag", "evicted",
+    )
+
+    def __init__(self, client_id: str, ws: WebSocket, sub: Subscription):
+        self.client_id = client_id
+        self.ws = ws
+        self.sub = sub
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = time.monotonic()
+        self.sent = 0
+        self.last_lag = 0.0
+        self.avg_lag = 0.0
+        self.max_lag = 0.0
+        self.evicted: Optional[str] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self.sub.close()
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    async def _run(self):
+        try:
+            async for event in self.sub:
+                waited = time.perf_counter() - event.published_at
+                if waited > MAX_LAG:
+                    await self._evict(f"update waited {waited:.1f}s")
+                    return
+
+                send_start = time.perf_counter()
+                await asyncio.wait_for(self.ws.send_text(event.message), SEND_TIMEOUT)
+                now = time.perf_counter()
+                STAGE_SECONDS.observe("send", now - send_start)
+
+                lag = now - event.published_at
+                self.sent += 1
+                self.last_lag = lag
+                self.avg_lag += LAG_ALPHA * (lag - self.avg_lag)
+                if lag > self.max_lag:
+                    self.max_lag = lag
+        except asyncio.TimeoutError:
+            await self._evict(f"send stalled over {SEND_TIMEOUT:g}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Socket already gone - the receive loop cleans up
+            print(f"⚠️ Send to {self.client_id} failed: {e}")
+        finally:
+            self.sub.close()
+
+    async def _evict(self, reason: str):
+        self.evicted = reason
+        print(f"🐢 Evicting slow client {self.client_id}: {reason}")
+        try:
+            await asyncio.wait_for(self.ws.close(code=EVICT_CODE), SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "client": self.client_id,
+            "room": self.sub.topic,
+            "connected": round(time.monotonic() - self.connected_at, 1),
+            "sent": self.sent,
+            "queued": len(self.sub),
+            "dropped": self.sub.dropped,
+            "coalesced": self.sub.coalesced,
+            "lagMs": round(self.last_lag * 1000, 3),
+            "avgLagMs": round(self.avg_lag * 1000, 3),
+            "maxLagMs": round(self.max_lag * 1000, 3),
+            "oldestQueuedMs": round(self.sub.oldest_age() * 1000, 3),
+            "evicted": self.evicted,
+        }
+
+
+class FanOut:
+    """All live client senders, for lifecycle and metrics"""
+
+    def __init__(self):
+        self._clients: dict[str, ClientSender] = {}
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def attach(self, client_id: str, ws: WebSocket, sub: Subscription) -> ClientSender:
+        sender = ClientSender(client_id, ws, sub)
+        self._clients[client_id] = sender
+        sender.start()
+        return sender
+
+    def detach(self, client_id: str):
+        sender = self._clients.pop(client_id, None)
+        if sender is not None:
+            sender.stop()
+
+    def stats(self) -> list[dict]:
+        return [c.stats() for c in self._clients.values()]
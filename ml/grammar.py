@@ -0,0 +1,142 @@
+"""
+Grammar-Constrained Decoding
+Restricts T5 generation to well-formed "Book|chapter|verse" outputs
+
+The output grammar is compiled once per tokenizer:
+  book    - a prefix trie over the token ids of every book name (+ "|")
+  chapter - 1-3 digits, then "|"
+  verse   - 0-3 digits, then end of sequence
+At each step only the tokens the grammar allows are scored, decoding stops
+as soon as the verse field closes, and the output is rebuilt from the token
+ids - so every result names a real book and parses.
+"""
+from aliases import BOOK_IDS
+
+SEPARATOR = "|"
+
+# Digits allowed per numeric field (Psalm 119:176 is the widest reference)
+MAX_DIGITS = 3
+
+# Training labels that differ from the canonical name (data/generate.py)
+LABEL_NAMES = {"Psalm": "Psalms"}
+
+# Key under which a trie node stores the completed book name
+_END = None
+
+
+class OutputGrammar:
+    """Token-level grammar of resolver outputs for one tokenizer"""
+
+    def __init__(self, tokenizer):
+        self.eos_id = tokenizer.eos_token_id
+        self.pad_id = tokenizer.pad_token_id
+        # Mid-word "|" piece, as it appears inside "John|3|16"
+        # (the unknown-piece id if the vocabulary lacks it - labels
+        # were tokenized the same way, so the grammar still matches)
+        self.sep_id = tokenizer.convert_tokens_to_ids(SEPARATOR)
+
+        # Book field: trie over each name's token ids up to the separator
+        self._root: dict = {}
+        names = {book: book for book in BOOK_IDS}
+        names.update(LABEL_NAMES)
+        self.max_book_tokens = 0
+        for label, book in names.items():
+            ids = tokenizer.encode(label + SEPARATOR, add_special_tokens=False)
+            if ids[-1] != self.sep_id:
+                ids.append(self.sep_id)
+            node = self._root
+            for token_id in ids:
+                node = node.setdefault(token_id, {})
+            node[_END] = book
+            self.max_book_tokens = max(self.max_book_tokens, len(ids))
+
+        # Numeric fields: pure digit pieces (no word-start marker)
+        self._digits: dict[int, str] = {}
+        for token_id in range(len(tokenizer)):
+            piece = tokenizer.convert_ids_to_tokens(token_id)
+            if piece and piece.isdigit() and len(piece) <= MAX_DIGITS:
+                self._digits[token_id] = piece
+        # Allowed digit ids by how many digits the field still has room for
+        self._digits_within = [
+            [t for t, piece in self._digits.items() if len(piece) <= room]
+            for room in range(MAX_DIGITS + 1)
+        ]
+        self._book_first = [t for t in self._root if t is not _END]
+
+    @property
+    def max_length(self) -> int:
+        """Upper bound on generated tokens (book, 2 fields, separator, EOS)"""
+        return self.max_book_tokens + 2 * MAX_DIGITS + 2
+
+    def _walk(self, ids: list[int]):
+        """
+        Follow generated ids through the grammar.
+        Returns (book trie node or None, field, digits in field, done).
+        """
+        node = self._root
+        i = 0
+        while i < len(ids) and _END not in node:
+            node = node.get(ids[i])
+            if node is None:
+                return None, 0, 0, True  # Off-grammar: only EOS left
+            i += 1
+        if _END not in node:
+            return node, 0, 0, False
+
+        field = digits = 0
+        for token_id in ids[i:]:
+            if token_id == self.sep_id:
+                field += 1
+                digits = 0
+            elif token_id in self._digits:
+                digits += len(self._digits[token_id])
+            else:
+                return None, field, digits, True  # EOS / padding
+        return None, field, digits, False
+
+    def allowed_tokens(self, batch_id: int, input_ids) -> list[int]:
+        """`prefix_allowed_tokens_fn` for model.generate"""
+        ids = input_ids.tolist()[1:]  # Drop the decoder start token
+        node, field, digits, done = self._walk(ids)
+        if done:
+            return [self.eos_id]
+        if node is not None:
+            return self._book_first if node is self._root else [t for t in node if t is not _END]
+
+        room = MAX_DIGITS - digits
+        allowed = list(self._digits_within[room])
+        if field == 0:
+            # Chapter: at least one digit before the separator
+            if digits:
+                allowed.append(self.sep_id)
+        elif field == 1:
+            # Verse may be empty; ends the output
+            allowed.append(self.eos_id)
+        else:
+            return [self.eos_id]
+        return allowed
+
+    def render(self, ids: list[int]) -> str:
+        """Rebuild "Book|chapter|verse" from generated ids ("" if incomplete)"""
+        ids = [t for t in ids if t != self.pad_id]
+        node = self._root
+        i = 0
+        while i < len(ids) and _END not in node:
+            node = node.get(ids[i])
+            if node is None:
+                return ""
+            i += 1
+        if _END not in node:
+            return ""
+
+        fields = [""]
+        for token_id in ids[i:]:
+            if token_id == self.sep_id:
+                fields.append("")
+            elif token_id in self._digits:
+                fields[-1] += self._digits[token_id]
+            else:
+                break
+        if len(fields) < 2 or not fields[0]:
+            return ""
+        return SEPARATOR.join([node[_END], fields[0], fields[1]])
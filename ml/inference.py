@@ -0,0 +1,353 @@
+"""
+ML Inference Worker
+Dynamic micro-batching in front of the trained T5 resolver
+
+Transcripts from every connection are gathered into one batch until it
+holds MAX_BATCH texts or the oldest has waited MAX_WAIT seconds. The batch
+runs `generate` in a single-thread executor (torch parallelizes inside),
+so the event loop never blocks. While a batch is in flight, new requests
+accumulate for the next one, so batch size grows with load.
+
+Model output uses the training format from train.py: "Book|chapter|verse"
+Backends: T5Backend (PyTorch), OnnxBackend (int8 export from export.py) or
+ClassifierBackend (encoder-only, `train.py classifier`)
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from aliases import BOOK_IDS, ALIAS_TO_BOOK
+from grammar import OutputGrammar
+
+ML_DIR = Path(__file__).parent
+
+# Batching window
+MAX_BATCH = 16
+MAX_WAIT = 0.01  # seconds
+
+# Generation limits - "1 Thessalonians|12|34" is well under this
+MAX_INPUT_TOKENS = 128
+MAX_OUTPUT_TOKENS = 16
+
+# Constrain decoding to valid "Book|chapter|verse" outputs
+CONSTRAINED = True
+
+# Dummy requests that compile kernels / fill allocator caches before the
+# model takes real traffic (short, long and batched shapes)
+WARMUP_TEXTS = [
+    "john three sixteen",
+    "turn with me to first corinthians chapter thirteen verse four",
+    "psalms one hundred and nineteen verse one hundred and five",
+    "romans eight",
+]
+WARMUP_ROUNDS = 2
+
+# Confidence reported for model answers
+ML_CONFIDENCE = 0.85
+
+
+def parse_model_output(output: str) -> Optional[dict]:
+    """
+    Parse "Book|chapter|verse" (verse may be empty) into a reference.
+    Returns None for anything malformed or naming an unknown book.
+    """
+    parts = [p.strip() for p in output.split("|")]
+    if len(parts) < 2:
+        return None
+
+    book = parts[0]
+    if book not in BOOK_IDS:
+        # Training labels use a few non-canonical names ("Psalm")
+        book = ALIAS_TO_BOOK.get(book.lower())
+        if book is None:
+            return None
+
+    try:
+        chapter = int(parts[1])
+    except ValueError:
+        return None
+    verse = None
+    if len(parts) > 2 and parts[2]:
+        try:
+            verse = int(parts[2])
+        except ValueError:
+            return None
+
+    return {
+        "book": book,
+        "bookId": BOOK_IDS[book],
+        "chapter": chapter,
+        "verse": verse,
+        "confidence": ML_CONFIDENCE,
+    }
+
+
+class T5Backend:
+    """Batched generation with the fine-tuned T5 model"""
+    name = "t5"
+
+    def __init__(self, model_path: Path, constrained: bool = CONSTRAINED):
+        import torch
+
+        self._torch = torch
+        self.tokenizer, self.model = self._load(model_path)
+        self.grammar = OutputGrammar(self.tokenizer) if constrained else None
+
+    def _load(self, model_path: Path):
+        from transformers import T5Tokenizer, T5ForConditionalGeneration
+
+        tokenizer = T5Tokenizer.from_pretrained(str(model_path))
+        model = T5ForConditionalGeneration.from_pretrained(str(model_path))
+        model.eval()
+        return tokenizer, model
+
+    def generate(self, texts: list[str]) -> list[str]:
+        """Raw model outputs for a batch of transcripts"""
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=MAX_INPUT_TOKENS,
+        )
+        if self.grammar is None:
+            with self._torch.inference_mode():
+                output_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=MAX_OUTPUT_TOKENS,
+                )
+            return self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+
+        # Greedy search over grammar-allowed tokens only; stops once every
+        # sequence has closed its verse field
+        with self._torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=self.grammar.max_length,
+                num_beams=1,
+                do_sample=False,
+                prefix_allowed_tokens_fn=self.grammar.allowed_tokens,
+            )
+        return [self.grammar.render(ids) for ids in output_ids.tolist()]
+
+
+class OnnxBackend(T5Backend):
+    """The same model exported by export.py: int8 ONNX graphs on onnxruntime"""
+    name = "onnx"
+
+    def _load(self, model_path: Path):
+        from transformers import T5TokenizerFast
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        tokenizer = T5TokenizerFast.from_pretrained(str(model_path))
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            str(model_path),
+            encoder_file_name="encoder_model_quantized.onnx",
+            decoder_file_name="decoder_model_quantized.onnx",
+            decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+            provider="CPUExecutionProvider",
+        )
+        return tokenizer, model
+
+
+class ClassifierBackend:
+    """Encoder-only classifier (classifier.py): one forward pass per batch"""
+    name = "classifier"
+
+    def __init__(self, model_path: Path):
+        import torch
+        from classifier import ReferenceClassifier, load_tokenizer
+
+        self._torch = torch
+        self.tokenizer = load_tokenizer(model_path)
+        self.model = ReferenceClassifier.load(model_path)
+
+    def generate(self, texts: list[str]) -> list[str]:
+        """Outputs in the same "Book|chapter|verse" format as T5"""
+        inputs = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=MAX_INPUT_TOKENS,
+        )
+        return self.model.predict(inputs.input_ids, inputs.attention_mask)
+
+
+# Backends by name, in "auto" preference order (fastest first)
+BACKENDS = {
+    "classifier": (ClassifierBackend, ML_DIR / "model-classifier"),
+    "onnx": (OnnxBackend, ML_DIR / "model-onnx"),
+    "t5": (T5Backend, ML_DIR / "model"),
+}
+
+
+def available_backends() -> list[str]:
+    """Backends whose model files are present"""
+    return [name for name, (_, path) in BACKENDS.items() if (path / "config.json").exists()]
+
+
+def load_backend(kind: str = "auto"):
+    """
+    Load a backend by name, or "auto" for the fastest one available.
+    Returns None when the requested model isn't there.
+    """
+    available = available_backends()
+    if kind == "auto":
+        kind = available[0] if available else None
+    if kind not in available:
+        return None
+    backend_cls, path = BACKENDS[kind]
+    return backend_cls(path)
+
+
+def warm_up(backend, rounds: int = WARMUP_ROUNDS) -> float:
+    """Run dummy generations (single and batched); returns seconds taken"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in WARMUP_TEXTS:
+            backend.generate([text])
+        backend.generate(WARMUP_TEXTS)
+    return time.perf_counter() - start
+
+
+class ModelLoader:
+    """Loads and warms a backend off the event loop, tracking readiness"""
+
+    def __init__(self, kind: str = "auto"):
+        self.kind = kind
+        self.state = "idle"  # idle → loading → warming → ready | failed
+        self.backend = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    async def load(self):
+        """Load then warm up in a thread; returns the backend or None"""
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            backend = await asyncio.to_thread(load_backend, self.kind)
+            if backend is None:
+                raise RuntimeError(f"no {self.kind} model found")
+            self.load_seconds = time.perf_counter() - start
+
+            self.state = "warming"
+            self.warmup_seconds = await asyncio.to_thread(warm_up, backend)
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"❌ Model load failed: {e}")
+            return None
+
+        self.backend = backend
+        self.state = "ready"
+        print(f"✅ ML model ready ({backend.name}: load {self.load_seconds:.1f}s, warm-up {self.warmup_seconds:.1f}s)")
+        return backend
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else self.kind,
+            "state": self.state,
+            "loadSeconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "warmupSeconds": round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+class MicroBatcher:
+    """Collects requests from all connections into bounded batches"""
+
+    def __init__(self, backend, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Batches run concurrently only for backends that can take them
+        # (WorkerPool: one per worker process)
+        self.max_in_flight = getattr(backend, "concurrency", 1)
+        self._in_flight = 0
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.failures = 0
+        self.last_batch_ms = 0.0
+
+    async def resolve(self, text: str) -> Optional[dict]:
+        """Model reference for one transcript (None if unparseable)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None and self._in_flight < self.max_in_flight:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up (deadline) don't take a batch slot
+        self._pending = [p for p in self._pending if not p[1].done()]
+        # Running batches flush again when they finish
+        while self._pending and self._in_flight < self.max_in_flight:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            self._in_flight += 1
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(self.backend.generate):
+                outputs = await self.backend.generate(texts)
+            else:
+                outputs = await loop.run_in_executor(self._executor, self.backend.generate, texts)
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(parse_model_output(output))
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ Inference batch failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            self.last_batch_ms = (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.batched_items += len(batch)
+            self._in_flight -= 1
+            # Whatever queued up meanwhile goes out as the next batch
+            if self._pending:
+                self._flush()
+
+    @property
+    def ready(self) -> bool:
+        """False while a worker pool has no loaded worker"""
+        return bool(getattr(self.backend, "ready", True))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avgBatch": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+            "inFlight": self._in_flight,
+            "failures": self.failures,
+            "lastBatchMs": round(self.last_batch_ms, 2),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,168 @@
+"""
+Transcript Ingest Queue
+Per-connection buffer between the websocket reader and the resolver
+
+When ASR produces faster than the resolver consumes (e.g. while a model
+inference is in flight), superseded partial transcripts are coalesced so
+the resolver always works on the newest words:
+  - a new partial replaces any queued partial (latest wins)
+  - a final replaces queued partials (it completes them) and is always kept
+  - commands ("next", "go back") are always kept, in order
+When the buffer is full of finals/commands the reader waits, which pushes
+backpressure onto the socket.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from metrics import ERRORS
+from tracing import Trace
+from utterance import parse_utterance
+
+# Max transcripts buffered per connection
+INGEST_SIZE = 32
+
+
+@dataclass(slots=True)
+class Transcript:
+    """One inbound transcript message"""
+    text: str
+    is_final: bool = False
+    is_command: bool = False
+    received_at: float = field(default_factory=time.perf_counter)
+    trace: Optional[Trace] = None
+
+    @property
+    def keep(self) -> bool:
+        """Finals and commands are never coalesced away"""
+        return self.is_final or self.is_command
+
+
+def make_transcript(text: str, is_final: bool = False,
+                    trace: Optional[Trace] = None) -> Transcript:
+    """Build a Transcript, classifying commands from the (cached) parse"""
+    try:
+        utterance = parse_utterance(text)
+    except Exception as e:
+        # Runs in the websocket reader: a bad transcript must not end the
+        # connection. Queue it as a plain transcript; the processor's own
+        # error handling records the outcome.
+        ERRORS.inc()
+        print(f"❌ Failed to parse '{text}': {e}")
+        if trace is not None:
+            trace.span("normalize", trace.started, time.perf_counter(), f"error: {e}")
+        return Transcript(text=text, is_final=is_final, trace=trace)
+    transcript = Transcript(
+        text=text,
+        is_final=is_final,
+        is_command=utterance.is_next or utterance.is_previous,
+        trace=trace,
+    )
+    if trace is not None:
+        trace.span("normalize", trace.started, time.perf_counter(), utterance.normalized)
+    return transcript
+
+
+class IngestQueue:
+    """Bounded latest-wins queue of transcripts for one connection"""
+
+    def __init__(self, maxsize: int = INGEST_SIZE):
+        self.maxsize = maxsize
+        self._items: deque[Transcript] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self.closed = False
+        self.received = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _drop_partials(self) -> int:
+        """Remove every queued partial; returns how many"""
+        kept = deque()
+        for t in self._items:
+            if t.keep:
+                kept.append(t)
+            elif t.trace is not None:
+                t.trace.finish("coalesced")
+        removed = len(self._items) - len(kept)
+        self._items = kept
+        return removed
+
+    def _drop(self, item: Transcript):
+        self.dropped += 1
+        if item.trace is not None:
+            item.trace.finish("dropped")
+
+    async def put(self, item: Transcript):
+        """Enqueue, coalescing partials; waits only when full of keepers"""
+        self.received += 1
+
+        if not item.keep:
+            # Latest partial wins over any queued partial
+            self.coalesced += self._drop_partials()
+        elif item.is_final:
+            # A final completes the partials queued before it
+            self.coalesced += self._drop_partials()
+
+        while len(self._items) >= self.maxsize and not self.closed:
+            if not item.keep:
+                # Never block the reader for a partial
+                self._drop(item)
+                return
+            self._space.clear()
+            await self._space.wait()
+
+        if self.closed:
+            self._drop(item)
+            return
+
+        self._items.append(item)
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+
+    async def get(self) -> Optional[Transcript]:
+        """Next transcript, or None once closed and empty"""
+        while not self._items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        item = self._items.popleft()
+        self._space.set()
+        self.processed += 1
+        self.wait_total += time.perf_counter() - item.received_at
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Transcript:
+        item = await self.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+        self._space.set()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "depth": len(self._items),
+            "maxDepth": self.max_depth,
+            "avgWaitMs": round(self.wait_total / self.processed * 1000, 3) if self.processed else 0.0,
+        }
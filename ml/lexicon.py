@@ -0,0 +1,205 @@
+"""
+Lexicon Automaton for ASR Normalization
+Compiles BOOK_ALIASES / NUMBER_ALIASES once into a word-level trie
+
+Phrases are matched over word tokens in a single left-to-right pass, so the
+cost scales with transcript length, not with the number of aliases:
+  "fast corinthians tree sixteen" → [book 1 Corinthians] [3] [16]
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from aliases import BOOK_ALIASES, NUMBER_ALIASES, ALIAS_TO_BOOK, build_alias_map
+from cache import clear_caches
+
+# Word tokens - same notion of a word as the \b boundaries used elsewhere
+_WORD_RE = re.compile(r"\w+")
+
+# Entry kinds stored at trie terminals
+BOOK = "book"
+NUMBER = "number"
+VERSE = "verse"
+CHAPTER = "chapter"
+
+# Spoken keywords folded into the same pass
+VERSE_KEYWORDS = ["versus", "vs", "v"]
+CHAPTER_KEYWORDS = ["chapter", "chapters"]
+
+# Key under which a trie node stores its terminal entries
+_END = ""
+
+
+@dataclass(frozen=True)
+class LexMatch:
+    """A lexicon hit spanning one or more words of the input"""
+    kind: str
+    value: object
+    start: int  # Character offset in the scanned text
+    end: int
+    first_word: int  # Word index range [first_word, last_word)
+    last_word: int
+
+
+class Lexicon:
+    """Word-level trie of alias phrases with a single-pass scanner"""
+
+    def __init__(self):
+        self._root: dict = {}
+        self.size = 0
+
+    def add(self, phrase: str, kind: str, value: object):
+        """Register a phrase; the first registration for a kind wins"""
+        words = _WORD_RE.findall(phrase.lower())
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        entries = node.setdefault(_END, {})
+        if kind not in entries:
+            # Rank lets the scanner prefer the longest book alias, then
+            # the earliest registered one
+            entries[kind] = (value, (-len(phrase), self.size))
+            self.size += 1
+
+    def scan(self, text: str) -> list[LexMatch]:
+        """
+        Find non-overlapping lexicon matches in text.
+
+        Phrases may span several words as long as only whitespace separates
+        them. At most one book is reported: the longest alias anywhere in
+        the text (earliest registered alias on ties, leftmost occurrence).
+        Every other word is matched leftmost-longest against the number and
+        keyword entries, without overlapping the chosen book.
+        """
+        tokens = list(_WORD_RE.finditer(text))
+        n = len(tokens)
+        root = self._root
+
+        # Candidates per word position: best book and non-book phrase ends
+        book = None  # (rank, position, length, value)
+        others: list[Optional[list]] = [None] * n
+
+        for i in range(n):
+            node = root
+            j = i
+            while j < n:
+                if j > i and not text[tokens[j - 1].end():tokens[j].start()].isspace():
+                    break
+                node = node.get(tokens[j].group())
+                if node is None:
+                    break
+                j += 1
+                entries = node.get(_END)
+                if not entries:
+                    continue
+                for kind, (value, rank) in entries.items():
+                    if kind == BOOK:
+                        key = (rank, i)
+                        if book is None or key < book[0]:
+                            book = (key, i, j - i, value)
+                    else:
+                        if others[i] is None:
+                            others[i] = []
+                        others[i].append((j - i, kind, value))
+
+        book_start, book_end = n, n
+        if book is not None:
+            book_start = book[1]
+            book_end = book_start + book[2]
+
+        matches: list[LexMatch] = []
+        i = 0
+        while i < n:
+            if i == book_start:
+                matches.append(self._match(tokens, BOOK, book[3], i, book_end))
+                i = book_end
+                continue
+            limit = book_start if i < book_start else n
+            best = None
+            for length, kind, value in others[i] or ():
+                if i + length <= limit and (best is None or length > best[0]):
+                    best = (length, kind, value)
+            if best:
+                matches.append(self._match(tokens, best[1], best[2], i, i + best[0]))
+                i += best[0]
+            else:
+                i += 1
+
+        return matches
+
+    @staticmethod
+    def _match(tokens: list, kind: str, value: object, first: int, last: int) -> LexMatch:
+        return LexMatch(
+            kind=kind,
+            value=value,
+            start=tokens[first].start(),
+            end=tokens[last - 1].end(),
+            first_word=first,
+            last_word=last,
+        )
+
+    def rewrite(self, text: str) -> str:
+        """Replace every match with its canonical surface form"""
+        return splice(text, self.scan(text))
+
+
+def splice(text: str, matches: list[LexMatch]) -> str:
+    """Rebuild text with each match replaced by its surface form"""
+    if not matches:
+        return text
+
+    out = []
+    pos = 0
+    for m in matches:
+        out.append(text[pos:m.start])
+        out.append(surface(m))
+        pos = m.end
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def surface(match: LexMatch) -> str:
+    """Normalized text for a match: "luke", "3", "verse" or "" for chapter"""
+    if match.kind == BOOK:
+        return match.value.lower()
+    if match.kind == NUMBER:
+        return str(match.value)
+    if match.kind == VERSE:
+        return "verse"
+    return ""
+
+
+def build_lexicon() -> Lexicon:
+    """Compile the alias tables into a fresh Lexicon"""
+    lex = Lexicon()
+    for book, aliases in BOOK_ALIASES.items():
+        for alias in aliases:
+            lex.add(alias, BOOK, book)
+    for word, num in NUMBER_ALIASES.items():
+        lex.add(word, NUMBER, num)
+    for word in VERSE_KEYWORDS:
+        lex.add(word, VERSE, None)
+    for word in CHAPTER_KEYWORDS:
+        lex.add(word, CHAPTER, None)
+    return lex
+
+
+# Shared automaton, built once at import
+LEXICON = build_lexicon()
+
+
+def reload_lexicon():
+    """
+    Rebuild the shared automaton after BOOK_ALIASES / NUMBER_ALIASES were
+    edited at runtime. Cached results computed from the old tables are dropped.
+    """
+    fresh = build_lexicon()
+    LEXICON._root = fresh._root
+    LEXICON.size = fresh.size
+
+    ALIAS_TO_BOOK.clear()
+    ALIAS_TO_BOOK.update(build_alias_map())
+
+    clear_caches()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Resolver Load Test
+Many simulated clients replaying transcript streams against /resolve
+
+Each client opens its own websocket (its own private room, or all share
+--room) and replays the corpus from its own offset: one `transcript`
+message per row, spaced by the rows' "t" timestamps (seconds) or by
+--interval, all divided by --speed. A labeled row is answered by the
+first `verse` message naming its book and chapter; unlabeled rows by the
+next verse of any kind.
+
+Reports send → verse latency p50/p99, messages and verses per second,
+dropped sends (no verse within --timeout: unresolved, coalesced or
+unchanged state) and the server's RSS from /health during the run.
+
+  python loadtest.py --clients 50 --speed 10 --duration 60
+  python loadtest.py --corpus sermon.jsonl --clients 200 --speed 1 --json load.json
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.request
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import websockets
+
+from procstats import percentile
+from evaluate import DATA_PATH, iter_rows
+
+SERVER = "ws://127.0.0.1:8765"
+
+# Gap between utterances when the corpus has no timestamps (real time)
+INTERVAL = 2.0
+
+# A send with no verse after this long counts as dropped
+TIMEOUT = 5.0
+
+# Server RSS is sampled this often
+POLL_INTERVAL = 1.0
+
+
+def load_corpus(path: Path, limit: Optional[int] = None) -> list[dict]:
+    """Rows with "text", optional "t" and optional labels"""
+    rows = []
+    for row in iter_rows(path, limit) if _labeled(path) else _plain_rows(path, limit):
+        rows.append(row)
+    return rows
+
+
+def _labeled(path: Path) -> bool:
+    with open(path) as f:
+        first = json.loads(next((line for line in f if line.strip()), "{}"))
+    return "book" in first
+
+
+def _plain_rows(path: Path, limit: Optional[int]):
+    with open(path) as f:
+        for i, line in enumerate(line for line in f if line.strip()):
+            if limit is not None and i >= limit:
+                return
+            row = json.loads(line)
+            yield {"text": row["text"], "t": row.get("t")}
+
+
+def schedule(rows: list[dict], offset: int, count: int, interval: float, speed: float) -> list[tuple[float, dict]]:
+    """(seconds from start, row) for one client, wrapping around the corpus"""
+    plan = []
+    at = 0.0
+    previous_t = None
+    for i in range(count):
+        row = rows[(offset + i) % len(rows)]
+        t = row.get("t")
+        if i:
+            gap = t - previous_t if t is not None and previous_t is not None and t >= previous_t else interval
+            at += gap / speed
+        previous_t = t
+        plan.append((at, row))
+    return plan
+
+
+class Stats:
+    """Totals across every client"""
+
+    def __init__(self):
+        self.sent = 0
+        self.verses = 0
+        self.unexpected = 0
+        self.dropped = 0
+        self.errors = 0
+        self.receive_errors = 0
+        self.latencies: list[float] = []
+        self.rss: list[float] = []
+
+
+async def run_client(index: int, url: str, plan: list[tuple[float, dict]],
+                     timeout: float, start: float, stats: Stats):
+    """Replay one stream and match verses to sends"""
+    # (send time, expected (book, chapter) or None)
+    pending: deque[tuple[float, Optional[tuple]]] = deque()
+
+    def expire(now: float):
+        while pending and now - pending[0][0] > timeout:
+            pending.popleft()
+            stats.dropped += 1
+
+    async def receive(ws):
+        async for raw in ws:
+            now = time.perf_counter()
+            msg = json.loads(raw)
+            if msg.get("type") != "verse":
+                continue
+            stats.verses += 1
+            expire(now)
+            key = (msg.get("book"), msg.get("chapter"))
+            for i, (sent_at, expected) in enumerate(pending):
+                if expected is None or expected == key:
+                    del pending[i]
+                    stats.latencies.append((now - sent_at) * 1000)
+                    break
+            else:
+                stats.unexpected += 1
+
+    receiver = None
+    try:
+        async with websockets.connect(url, max_queue=None) as ws:
+            receiver = asyncio.create_task(receive(ws))
+            for at, row in plan:
+                delay = start + at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                expected = (row["book"], row["chapter"]) if row.get("book") else None
+                pending.append((time.perf_counter(), expected))
+                await ws.send(json.dumps({"type": "transcript", "text": row["text"], "isFinal": True}))
+                stats.sent += 1
+                expire(time.perf_counter())
+
+            # Give the last sends their full timeout
+            deadline = time.perf_counter() + timeout
+            while pending and not receiver.done() and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+    except (OSError, websockets.WebSocketException) as e:
+        stats.errors += 1
+        print(f"❌ Client {index}: {e}")
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+            try:
+                await receiver
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # Verses stopped arriving: later sends count as dropped
+                stats.receive_errors += 1
+                print(f"❌ Client {index} receiver: {e}")
+    stats.dropped += len(pending)
+
+
+def server_rss(health_url: str) -> Optional[float]:
+    try:
+        with urllib.request.urlopen(health_url, timeout=2) as r:
+            return json.loads(r.read())["process"]["rssMb"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+async def poll_rss(health_url: str, stats: Stats):
+    while True:
+        rss = await asyncio.to_thread(server_rss, health_url)
+        if rss is not None:
+            stats.rss.append(rss)
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def run(args) -> dict:
+    rows = load_corpus(args.corpus, args.limit)
+    if not rows:
+        raise SystemExit(f"❌ No rows in {args.corpus}")
+    per_client = args.utterances or max(1, int(args.duration * args.speed / args.interval))
+    stride = max(1, len(rows) // args.clients)
+    url = args.server.rstrip("/") + "/resolve" + (f"?room={args.room}" if args.room else "")
+    health_url = args.server.replace("ws", "http", 1).rstrip("/") + "/health"
+
+    stats = Stats()
+    rss_before = server_rss(health_url)
+    poller = asyncio.create_task(poll_rss(health_url, stats))
+
+    print(f"🚦 {args.clients} clients × {per_client} utterances at {args.speed:g}x → {url}")
+    start = time.perf_counter() + 0.5  # Let every client connect first
+    await asyncio.gather(*(
+        run_client(i, url, schedule(rows, i * stride, per_client, args.interval, args.speed),
+                   args.timeout, start, stats)
+        for i in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - start
+    poller.cancel()
+
+    return {
+        "clients": args.clients,
+        "speed": args.speed,
+        "seconds": round(elapsed, 2),
+        "sent": stats.sent,
+        "verses": stats.verses,
+        "answered": len(stats.latencies),
+        "dropped": stats.dropped,
+        "unexpected": stats.unexpected,
+        "connectErrors": stats.errors,
+        "receiveErrors": stats.receive_errors,
+        "sendRate": round(stats.sent / elapsed, 1),
+        "verseRate": round(stats.verses / elapsed, 1),
+        "latencyMs": {
+            "p50": round(percentile(stats.latencies, 0.50), 2),
+            "p99": round(percentile(stats.latencies, 0.99), 2),
+            "max": round(max(stats.latencies), 2),
+        } if stats.latencies else None,
+        "serverRssMb": {
+            "before": rss_before,
+            "peak": max(stats.rss) if stats.rss else None,
+            "after": server_rss(health_url),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--server", default=SERVER)
+    parser.add_argument("--corpus", type=Path, default=DATA_PATH, help="JSONL with text (+ t, book, chapter)")
+    parser.add_argument("--limit", type=int, default=None, help="corpus rows to load")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between untimed rows")
+    parser.add_argument("--duration", type=float, default=30.0, help="stream length per client (corpus time)")
+    parser.add_argument("--utterances", type=int, default=None, help="sends per client (overrides --duration)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT)
+    parser.add_argument("--room", help="share one room between all clients")
+    parser.add_argument("--json", type=Path, help="write the report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    lat = report["latencyMs"] or {}
+    rss = report["serverRssMb"]
+    print(f"\n📤 Sent       {report['sent']} ({report['sendRate']}/s)")
+    print(f"📥 Verses     {report['verses']} ({report['verseRate']}/s), "
+          f"{report['answered']} matched, {report['unexpected']} unmatched")
+    print(f"🕳️ Dropped    {report['dropped']} ({report['dropped'] / max(report['sent'], 1):.1%})")
+    if report["connectErrors"] or report["receiveErrors"]:
+        print(f"❌ Errors     {report['connectErrors']} connect, {report['receiveErrors']} receive")
+    print(f"⏱️ Latency    p50 {lat.get('p50')} ms, p99 {lat.get('p99')} ms, max {lat.get('max')} ms")
+    print(f"🧠 Server RSS {rss['before']} → peak {rss['peak']} → {rss['after']} MB")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"📁 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
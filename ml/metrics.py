@@ -0,0 +1,163 @@
+"""
+Resolver Metrics
+Per-stage latency histograms and counters in Prometheus text format
+
+Histograms keep one fixed array of bucket counts per label value, so an
+observation is a bisect plus two adds. No locks are taken: updates come
+from the event loop thread, and the rare one from another thread (e.g.
+an off-loop publish) can at worst lose a single count. Values that
+already live elsewhere (cache counters, queue depths) are read by
+collectors only when /metrics is scraped.
+
+  t0 = time.perf_counter()
+  ...
+  STAGE_SECONDS.observe("session", time.perf_counter() - t0)
+"""
+import math
+from bisect import bisect_left
+from typing import Callable, Optional, Union
+
+# Seconds; spans a cached regex hit (~20µs) to a slow model batch
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+Sample = Union[float, dict[str, float]]
+
+
+def _labels(label: Optional[str], value: Optional[str], extra: str = "") -> str:
+    parts = [f'{label}="{value}"'] if label and value is not None else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count, optionally split by one label"""
+    __slots__ = ("name", "help", "label", "values")
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: dict[Optional[str], float] = {}
+
+    def inc(self, value: Optional[str] = None, amount: float = 1):
+        values = self.values
+        values[value] = values.get(value, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, count in self.values.items():
+            lines.append(f"{self.name}{_labels(self.label, value)} {_number(count)}")
+        return lines
+
+
+class Histogram:
+    """Bucketed observations, optionally split by one label"""
+    __slots__ = ("name", "help", "label", "bounds", "series")
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None,
+                 buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.bounds = tuple(buckets)
+        # label value -> [bucket counts..., +Inf count, sum]
+        self.series: dict[Optional[str], list] = {}
+
+    def observe(self, value: Optional[str], amount: float):
+        """Record one observation (value is the label, e.g. a stage name)"""
+        series = self.series.get(value)
+        if series is None:
+            series = self.series[value] = [0] * (len(self.bounds) + 1) + [0.0]
+        series[bisect_left(self.bounds, amount)] += 1
+        series[-1] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.bounds, math.inf), series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label, value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, value)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label, value)} {cumulative}")
+        return lines
+
+
+class Collector:
+    """A gauge or counter read from elsewhere at scrape time"""
+    __slots__ = ("name", "help", "kind", "label", "fn")
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Sample],
+                 kind: str = "gauge", label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label = label
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        sample = self.fn()
+        items = sample.items() if isinstance(sample, dict) else [(None, sample)]
+        for value, number in items:
+            lines.append(f"{self.name}{_labels(self.label, value)} {_number(number)}")
+        return lines
+
+
+class Registry:
+    """Every metric exposed by /metrics"""
+
+    def __init__(self):
+        self._metrics: dict[str, Union[Counter, Histogram, Collector]] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        return self._add(Counter(name, help, label))
+
+    def histogram(self, name: str, help: str, label: Optional[str] = None,
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, label, buckets))
+
+    def collect(self, name: str, help: str, fn: Callable[[], Sample],
+                kind: str = "gauge", label: Optional[str] = None) -> Collector:
+        return self._add(Collector(name, help, fn, kind, label))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry and the resolver's own metrics
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "resolver_stage_seconds", "Time spent in each resolver stage", label="stage")
+TRANSCRIPT_SECONDS = REGISTRY.histogram(
+    "resolver_transcript_seconds", "Transcript receipt to resolution, including queueing")
+TRANSCRIPTS = REGISTRY.counter(
+    "resolver_transcripts_total", "Transcripts received", label="kind")
+RESOLVED = REGISTRY.counter(
+    "resolver_resolved_total", "Transcripts resolved, by the path that resolved them", label="path")
+FAILURES = REGISTRY.counter(
+    "resolver_failures_total", "Transcripts nothing could resolve")
+ERRORS = REGISTRY.counter(
+    "resolver_errors_total", "Exceptions while resolving a transcript")
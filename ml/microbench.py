@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Resolver Microbenchmarks
+Per-call time and memory of the hot paths, checked against a saved baseline
+
+Every benchmark runs one function the server calls per transcript over a
+fixed corpus: unique transcripts sampled from data/bible_resolver.jsonl
+plus the phrases the modules test themselves with. Inputs are what the
+server passes - the raw text, or the utterance it parsed once. Memoized
+functions are timed through their uncached __wrapped__ function and the
+cascade starts each pass with cold caches, so the numbers measure the
+work rather than the LRU lookup.
+
+  time    best of --repeat passes, reported per call
+  memory  tracemalloc peak during one pass (bytes above the start)
+
+  python microbench.py --save          # record microbench_baseline.json
+  python microbench.py                 # compare; exit 1 on a regression
+  python microbench.py --tolerance 0.1 --only parse_utterance cascade_resolve
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from benchmark import load_samples
+from cache import clear_caches
+from normalize import normalize_text
+from resolver import CascadeResolver, extract_reference_fallback, resolve_utterance
+from session import SessionManager, is_next_command
+from state_machine import ReferenceTracker
+from timers import TimerWheel
+from utterance import detect_range, parse_utterance
+
+ML_DIR = Path(__file__).parent
+BASELINE_PATH = ML_DIR / "microbench_baseline.json"
+
+# Transcripts sampled from the dataset
+CORPUS_SIZE = 500
+REPEAT = 5
+
+# A benchmark regresses when slower (or hungrier) than baseline by this much
+TOLERANCE = 0.25
+# Peak memory differences below this are noise
+MEMORY_SLACK = 4096
+
+# The phrases from the modules' own __main__ tests
+TEST_PHRASES = [
+    "Luke chapter 1 verse 2",
+    "look chapter 1 verse to",
+    "fast corinthians tree sixteen",
+    "first corinthians 13 4",
+    "john tree sixteen",
+    "jon tree sixteen",
+    "genesis one one",
+    "genes is won won",
+    "revelation twenty one",
+    "sam twenty three",
+    "the salon onions one four tree",
+    "john", "john 3", "john 3 16", "verse 17", "genesis", "genesis 1", "1 1",
+    "mark chapter 3", "genesis 1 4", "verse 5", "next verse",
+    "genesis 1 verse 4 to 9", "next",
+    "john chapter three verse sixteen",
+    "first corinthians thirteen",
+    "psalm twenty three",
+]
+
+
+def build_corpus(size: int = CORPUS_SIZE) -> list[str]:
+    """Raw transcripts, as the websocket delivers them"""
+    return list(dict.fromkeys([r["text"] for r in load_samples(limit=size)] + TEST_PHRASES))
+
+
+def uncached(fn: Callable) -> Callable:
+    return getattr(fn, "__wrapped__", fn)
+
+
+def benchmarks(raw: list[str]) -> dict[str, Callable[[], None]]:
+    """name → one pass over the corpus, calling what the server calls"""
+    wheel = TimerWheel(clock=lambda: 0.0)
+    utterances = [uncached(parse_utterance)(text) for text in raw]
+    cascade = CascadeResolver()
+    loop = asyncio.new_event_loop()
+
+    def over(fn: Callable, items: list) -> Callable[[], None]:
+        def run():
+            for item in items:
+                fn(item)
+        return run
+
+    def parse():
+        # Cold, so the nested detect_range is a miss too
+        clear_caches()
+        fn = uncached(parse_utterance)
+        for text in raw:
+            fn(text)
+
+    def field_of(name: str) -> Callable[[], None]:
+        # Book and number detection are one lexicon scan inside
+        # parse_utterance now; keep their names so old baselines compare
+        fn = uncached(parse_utterance)
+
+        def run():
+            clear_caches()
+            for text in raw:
+                getattr(fn(text), name)
+        return run
+
+    def process_utterance():
+        # One session hearing the whole corpus, as a room would
+        manager = SessionManager(timers=wheel)
+        for utterance in utterances:
+            manager.process_utterance(utterance)
+        manager.close()
+
+    def tracker_update():
+        tracker = ReferenceTracker()
+        for utterance in utterances:
+            tracker.update(utterance)
+
+    def cascade_resolve():
+        # Regex tier from raw text with cold caches (no model attached)
+        clear_caches()
+
+        async def run():
+            for text in raw:
+                await cascade.resolve(text)
+        loop.run_until_complete(run())
+
+    return {
+        "normalize_text": over(uncached(normalize_text), raw),
+        "detect_book": field_of("book"),
+        "extract_numbers": field_of("numbers"),
+        "is_next_command": over(is_next_command, raw),
+        "parse_utterance": parse,
+        "detect_range": over(uncached(detect_range), raw),
+        "process_utterance": process_utterance,
+        "tracker_update": tracker_update,
+        "resolve_utterance": over(resolve_utterance, utterances),
+        "extract_reference_fallback": over(extract_reference_fallback, raw),
+        "cascade_resolve": cascade_resolve,
+    }
+
+
+def measure(run: Callable[[], None], calls: int, repeat: int) -> dict:
+    run()  # Warm-up (imports, regex cache)
+    best = min(_timed(run) for _ in range(repeat))
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls": calls,
+        "nsPerCall": round(best / calls * 1e9, 1),
+        "peakBytes": peak - start,
+    }
+
+
+def _timed(run: Callable[[], None]) -> float:
+    t0 = time.perf_counter()
+    run()
+    return time.perf_counter() - t0
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Benchmarks slower or using more memory than baseline allows"""
+    problems = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        if result["nsPerCall"] > old["nsPerCall"] * (1 + tolerance):
+            problems.append(f"{name}: {old['nsPerCall']:.0f} → {result['nsPerCall']:.0f} ns/call")
+        if result["peakBytes"] > old["peakBytes"] * (1 + tolerance) + MEMORY_SLACK:
+            problems.append(f"{name}: peak {old['peakBytes']} → {result['peakBytes']} bytes")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE, help="transcripts sampled from the dataset")
+    parser.add_argument("--only", nargs="+", help="run just these benchmarks")
+    args = parser.parse_args()
+
+    raw = build_corpus(args.size)
+    suite = benchmarks(raw)
+    names = args.only or list(suite)
+    unknown = set(names) - set(suite)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    baseline = {}
+    if args.baseline.exists() and not args.save:
+        baseline = json.loads(args.baseline.read_text())["results"]
+
+    print(f"⏱️ {len(raw)} transcripts, best of {args.repeat}\n")
+    print(f"{'benchmark':<28} {'ns/call':>10} {'peak KB':>9} {'vs base':>8}")
+    results = {}
+    for name in names:
+        # The session and resolvers log with print; keep that out of the timings
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = measure(suite[name], len(raw), args.repeat)
+        r = results[name]
+        old = baseline.get(name)
+        delta = f"{r['nsPerCall'] / old['nsPerCall'] - 1:+.0%}" if old else ""
+        print(f"{name:<28} {r['nsPerCall']:>10.0f} {r['peakBytes'] / 1024:>9.1f} {delta:>8}")
+
+    if args.save:
+        args.baseline.write_text(json.dumps({
+            "corpus": len(raw),
+            "python": sys.version.split()[0],
+            "results": results,
+        }, indent=2))
+        print(f"\n📁 Baseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print("\nℹ️ No baseline yet - run with --save to record one")
+        return
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"❌ Regression: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"\n✅ Within {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
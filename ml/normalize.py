@@ -7,49 +7,35 @@ Transforms:
   "fast corinthians tree sixteen" → "1 corinthians 3 16"
 """
 import re
-from aliases import BOOK_ALIASES, NUMBER_ALIASES, ALIAS_TO_BOOK, BOOK_IDS
+from aliases import BOOK_IDS
+from lexicon import LEXICON
+from cache import memoize
 
+_WHITESPACE_RE = re.compile(r'\s+')
 
+
+@memoize
 def normalize_text(text: str) -> str:
     """
     Normalize ASR text for Bible reference detection.
     
     Steps:
     1. Lowercase
-    2. Replace book aliases with canonical names
-    3. Replace number words with digits
-    4. Remove filler words (chapter, verse, etc.)
-    5. Clean up whitespace
+    2. Single lexicon pass over the words:
+       - longest book alias → canonical name
+       - number words → digits
+       - verse keywords (versus, vs, v) → verse
+       - chapter keywords removed (verse is kept for the state machine)
+    3. Clean up whitespace
     """
     t = text.lower().strip()
     
-    # Normalize book aliases (longest first to avoid partial matches)
-    # Sort aliases by length descending to match longer phrases first
-    sorted_aliases = sorted(ALIAS_TO_BOOK.keys(), key=len, reverse=True)
-    for alias in sorted_aliases:
-        if alias in t:
-            canonical = ALIAS_TO_BOOK[alias].lower()
-            t = t.replace(alias, canonical, 1)
-            break  # Only replace first book match
-    
-    # Normalize multi-word numbers first (e.g., "twenty one")
-    multi_word_numbers = {k: v for k, v in NUMBER_ALIASES.items() if " " in k}
-    for word, num in sorted(multi_word_numbers.items(), key=lambda x: len(x[0]), reverse=True):
-        t = t.replace(word, str(num))
-    
-    # Normalize single-word numbers
-    for word, num in NUMBER_ALIASES.items():
-        if " " not in word:  # Skip multi-word (already handled)
-            t = re.sub(rf'\b{re.escape(word)}\b', str(num), t)
-    
-    # Normalize verse keywords (versus, vs → verse)
-    t = re.sub(r'\b(versus|vs|v)\b', 'verse', t)
-    
-    # Remove chapter keyword (but keep verse for state machine)
-    t = re.sub(r'\b(chapter|chapters)\b', '', t)
+    # Longest book alias wins; number phrases match longest-first
+    # ("twenty one" before "twenty")
+    t = LEXICON.rewrite(t)
     
     # Clean up whitespace
-    t = re.sub(r'\s+', ' ', t).strip()
+    t = _WHITESPACE_RE.sub(' ', t).strip()
     
     return t
 
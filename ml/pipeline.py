@@ -0,0 +1,118 @@
+"""
+Transcript Pipeline
+The per-transcript resolver steps shared by the server and replay.py
+
+A room resolves each transcript in a fixed order:
+  1. session manager (commands, ranges, explicit verses, references)
+  2. reference state machine (references spoken over several transcripts)
+  3. the cascade (regex tier, then the model tier on ambiguity), whose
+     answer is fed back into the session
+
+handle_transcript() runs steps 1-2 and decides whether step 3 is worth
+running; resolve_with_cascade() runs step 3; process() runs them in
+order. The server and replay.py both call process(), so a replay takes
+exactly the branches the live server does.
+"""
+import time
+from typing import Callable, Optional
+
+from metrics import STAGE_SECONDS, RESOLVED
+from resolver import CascadeResolver
+from rooms import Room
+from tracing import TRACES, Trace
+from utterance import parse_utterance
+
+# publish(room_id, payload) delivers a verse message to the room's clients
+Publish = Callable[[str, dict], None]
+
+
+def handle_transcript(room: Room, text: str, publish: Publish,
+                      trace: Optional[Trace] = None) -> bool:
+    """
+    Resolve one transcript for a room with the session manager and state
+    machine, publishing any update. Returns False if the cascade should
+    try it.
+    """
+    # Parse once, shared by session manager and state machine (normally
+    # a cache hit: the reader parsed it to classify commands)
+    t0 = time.perf_counter()
+    utterance = parse_utterance(text)
+
+    # Process through session manager first
+    session_result = room.session.process_utterance(utterance)
+    t1 = time.perf_counter()
+    STAGE_SECONDS.observe("session", t1 - t0)
+    if trace is not None:
+        trace.span("session", t0, t1, room.session.last_branch)
+
+    if session_result and session_result.get("book"):
+        # Session manager handled it; its emit published the update
+        RESOLVED.inc("session")
+        if trace is not None:
+            trace.outcome = "session"
+        print(f"🎯 Session: {session_result.get('book')} {session_result.get('chapter')}:{session_result.get('verse')}")
+        return True
+
+    # Fallback to state machine
+    result = room.tracker.update(utterance)
+    t2 = time.perf_counter()
+    STAGE_SECONDS.observe("state_machine", t2 - t1)
+    if trace is not None:
+        trace.span("state_machine", t1, t2, room.tracker.state.as_string() or None)
+
+    if result and result.get("book") and result.get("chapter"):
+        RESOLVED.inc("state_machine")
+        if trace is not None:
+            trace.outcome = "state_machine"
+        publish(room.room_id, {
+            "type": "verse",
+            **result
+        })
+        print(f"🎯 Resolved: {result['book']} {result['chapter']}:{result.get('verse', '')}")
+        return True
+
+    # Commands and fragments are not worth resolving further
+    return not (len(text) > 5 and not utterance.is_next)
+
+
+async def resolve_with_cascade(cascade: CascadeResolver, room: Room, text: str,
+                               escalate: bool = True, trace: Optional[Trace] = None) -> bool:
+    """Run the tiered resolver and feed its answer to the room's session"""
+    start = time.perf_counter()
+    ref = await cascade.resolve(text, escalate=escalate)
+    end = time.perf_counter()
+    STAGE_SECONDS.observe("cascade", end - start)
+    if trace is not None:
+        trace.span("cascade", start, end,
+                   f"{ref['tier']}: {ref['book']} {ref['chapter']}:{ref['verse'] or ''}" if ref else None)
+    if not ref:
+        return False
+    RESOLVED.inc(f"cascade_{ref['tier']}")
+    print(f"🎯 Cascade ({ref['tier']}): {ref['book']} {ref['chapter']}:{ref['verse'] or ''}")
+    if trace is not None:
+        trace.outcome = f"cascade_{ref['tier']}"
+    # The session emits synchronously; attribute that emit to this trace
+    TRACES.current = trace
+    try:
+        room.session.apply_reference(ref["book"], ref["chapter"], ref["verse"])
+    finally:
+        TRACES.current = None
+    return True
+
+
+async def process(cascade: CascadeResolver, room: Room, text: str, is_final: bool,
+                  publish: Publish, trace: Optional[Trace] = None) -> bool:
+    """
+    The whole pipeline for one transcript. Returns False if nothing could
+    resolve it (commands and fragments count as handled).
+    """
+    # Emits during the synchronous steps belong to this trace
+    TRACES.current = trace
+    try:
+        handled = handle_transcript(room, text, publish, trace)
+    finally:
+        TRACES.current = None
+    if handled:
+        return True
+    # Only finals may escalate to the model; partials will be re-sent
+    return await resolve_with_cascade(cascade, room, text, escalate=is_final, trace=trace)
@@ -0,0 +1,204 @@
+"""
+Pre-tokenized Training Data
+Tokenize the JSONL once into memory-mapped arrays, then batch by length
+
+  1. pretokenize() runs the fast tokenizer over every row in one batch call
+     and saves flat token arrays + offsets as .npy under data/cache/<key>/.
+     The key covers the data file, tokenizer and limits, so edits to any of
+     them re-tokenize and anything else is a cache hit.
+  2. TokenizedDataset maps those arrays read-only (DataLoader workers share
+     the pages instead of each holding a copy).
+  3. LengthBucketSampler groups rows of similar length so pad_collate pads
+     each batch only to its own longest row.
+"""
+import hashlib
+import json
+import math
+import shutil
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler
+
+CACHE_DIR = Path(__file__).parent / "data" / "cache"
+
+# Bump when the on-disk layout changes
+CACHE_VERSION = 1
+
+# Batches are formed within pools of this many batches' worth of rows:
+# large enough to group similar lengths, small enough to stay random
+BUCKET_POOL = 50
+
+# Label positions ignored by the loss
+IGNORE_INDEX = -100
+
+
+def read_rows(path: Path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def cache_key(path: Path, tokenizer, target_fn: Optional[Callable],
+              max_input: int, max_target: int) -> str:
+    stat = Path(path).stat()
+    parts = [
+        CACHE_VERSION, Path(path).resolve(), stat.st_size, stat.st_mtime_ns,
+        tokenizer.name_or_path, len(tokenizer), max_input, max_target,
+        target_fn.__qualname__ if target_fn else None,
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def _save_ragged(directory: Path, name: str, sequences: list[list[int]]):
+    lengths = np.fromiter((len(s) for s in sequences), dtype=np.int64, count=len(sequences))
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter((t for s in sequences for t in s), dtype=np.int32, count=int(offsets[-1]))
+    np.save(directory / f"{name}_values.npy", values)
+    np.save(directory / f"{name}_offsets.npy", offsets)
+
+
+def pretokenize(path: Path, tokenizer, target_fn: Optional[Callable] = None,
+                max_input: int = 128, max_target: int = 64) -> Path:
+    """Tokenize once; returns the cache directory holding the arrays"""
+    key = cache_key(path, tokenizer, target_fn, max_input, max_target)
+    directory = CACHE_DIR / key
+    if (directory / "meta.json").exists():
+        print(f"📦 Using cached tokens: {directory}")
+        return directory
+
+    print(f"🔤 Tokenizing {path}...")
+    rows = read_rows(path)
+    staging = directory.with_name(key + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    inputs = tokenizer([r["text"] for r in rows], truncation=True, max_length=max_input)
+    _save_ragged(staging, "input", inputs["input_ids"])
+    if target_fn is not None:
+        targets = tokenizer([target_fn(r) for r in rows], truncation=True, max_length=max_target)
+        _save_ragged(staging, "target", targets["input_ids"])
+
+    (staging / "meta.json").write_text(json.dumps({
+        "source": str(path), "rows": len(rows), "tokenizer": tokenizer.name_or_path,
+    }))
+    # Publish atomically so a crash never leaves a half-written cache
+    shutil.rmtree(directory, ignore_errors=True)
+    staging.rename(directory)
+    print(f"✅ Cached {len(rows)} rows in {directory}")
+    return directory
+
+
+class RaggedArray:
+    """Variable-length int sequences over a memory-mapped flat array"""
+
+    def __init__(self, directory: Path, name: str):
+        self.values_path = directory / f"{name}_values.npy"
+        self.offsets_path = directory / f"{name}_offsets.npy"
+        self._values = None
+        self._offsets = np.load(self.offsets_path)
+
+    def __getstate__(self):
+        # Workers re-open the map instead of receiving a pickled copy
+        return {**self.__dict__, "_values": None}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self._offsets)
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        if self._values is None:
+            self._values = np.load(self.values_path, mmap_mode="r")
+        return self._values[self._offsets[idx]:self._offsets[idx + 1]]
+
+
+class TokenizedDataset(Dataset):
+    """Rows of a JSONL file as pre-tokenized input (and target) ids"""
+
+    def __init__(self, path, tokenizer, target_fn: Optional[Callable] = None,
+                 max_input: int = 128, max_target: int = 64):
+        self.tokenizer = tokenizer
+        directory = pretokenize(Path(path), tokenizer, target_fn, max_input, max_target)
+        self.inputs = RaggedArray(directory, "input")
+        self.targets = RaggedArray(directory, "target") if target_fn else None
+
+    def __len__(self):
+        return len(self.inputs)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self.inputs.lengths
+
+    def __getitem__(self, idx):
+        item = {"input_ids": self.inputs[idx]}
+        if self.targets is not None:
+            item["labels"] = self.targets[idx]
+        return item
+
+    def collate_fn(self):
+        return partial(pad_collate, pad_id=self.tokenizer.pad_token_id)
+
+
+class LengthBucketSampler(Sampler):
+    """Shuffled batches of similar-length rows (new order every epoch)"""
+
+    def __init__(self, lengths: np.ndarray, batch_size: int, shuffle: bool = True,
+                 pool: int = BUCKET_POOL, seed: int = 0):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_size = pool * batch_size
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        n = len(self.lengths)
+        full, rest = divmod(n, self.pool_size)
+        return full * math.ceil(self.pool_size / self.batch_size) + math.ceil(rest / self.batch_size)
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        self.epoch += 1
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+
+        batches = []
+        for start in range(0, len(order), self.pool_size):
+            pool = order[start:start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind="stable")]
+            batches.extend(pool[i:i + self.batch_size].tolist()
+                           for i in range(0, len(pool), self.batch_size))
+        if self.shuffle:
+            rng.shuffle(batches)
+        return iter(batches)
+
+
+def _pad(sequences: list[np.ndarray], value: int) -> torch.Tensor:
+    out = np.full((len(sequences), max(len(s) for s in sequences)), value, dtype=np.int64)
+    for i, s in enumerate(sequences):
+        out[i, :len(s)] = s
+    return torch.from_numpy(out)
+
+
+def pad_collate(rows: list[dict], pad_id: int) -> dict:
+    """
+    Pad input_ids (with attention_mask) and labels to the batch's longest
+    row; any other field is stacked as-is.
+    """
+    batch = {}
+    inputs = [r["input_ids"] for r in rows]
+    batch["input_ids"] = _pad(inputs, pad_id)
+    batch["attention_mask"] = _pad([np.ones(len(s), dtype=np.int64) for s in inputs], 0)
+    for key in rows[0]:
+        if key == "input_ids":
+            continue
+        if key == "labels":
+            batch["labels"] = _pad([r["labels"] for r in rows], IGNORE_INDEX)
+        else:
+            batch[key] = torch.as_tensor(np.stack([r[key] for r in rows]))
+    return batch
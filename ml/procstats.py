@@ -0,0 +1,33 @@
+"""
+Process Stats
+Resident memory and latency percentiles, shared by the server and its tools
+
+  rss_mb()                 current resident set size in MB
+  peak_rss_mb()            high-water resident set size in MB
+  percentile(values, q)    nearest-rank percentile, q in [0, 1]
+"""
+import resource
+import sys
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
@@ -0,0 +1,199 @@
+"""
+Live Process Profiling
+On-demand CPU, memory and event-loop profiling for the running server
+
+  SamplingProfiler  a daemon thread snapshots the target thread's stack
+                    every interval (sys._current_frames) and counts
+                    collapsed stacks: "outer;inner;leaf count" lines that
+                    flamegraph.pl, speedscope or inferno read directly
+  MemoryProfiler    tracemalloc from start() to a baseline snapshot; diff()
+                    reports which lines allocated the most since
+  loop_lag()        how late short sleeps wake up on the event loop
+
+Nothing runs until asked, every session has a hard time limit after which
+it stops by itself, and the sampling interval has a floor, so overhead is
+bounded even if nobody remembers to call stop.
+"""
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from procstats import percentile
+
+# CPU sampling
+SAMPLE_INTERVAL = 0.005      # 200 Hz
+MIN_SAMPLE_INTERVAL = 0.001
+MAX_PROFILE_SECONDS = 60.0
+MAX_STACK_DEPTH = 64
+
+# tracemalloc
+MEMORY_FRAMES = 10
+MAX_MEMORY_FRAMES = 25
+MAX_MEMORY_SECONDS = 300.0
+
+# Event loop lag
+LAG_INTERVAL = 0.01
+MAX_LAG_SECONDS = 30.0
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical CPU profile of one thread, as collapsed stacks"""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.target: Optional[int] = None
+        self.interval = SAMPLE_INTERVAL
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, target: Optional[int] = None, interval: float = SAMPLE_INTERVAL,
+              max_seconds: float = MAX_PROFILE_SECONDS):
+        """Sample target (default: the calling thread) until stop() or max_seconds"""
+        if self.running:
+            raise RuntimeError("a CPU profile is already running")
+        self.target = target or threading.get_ident()
+        self.interval = max(interval, MIN_SAMPLE_INTERVAL)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self.stopped_at = 0.0
+        self._thread = threading.Thread(
+            target=self._run, args=(min(max_seconds, MAX_PROFILE_SECONDS),),
+            name="cpu-profiler", daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, max_seconds: float):
+        deadline = time.monotonic() + max_seconds
+        stacks, target, interval = self.stacks, self.target, self.interval
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                break  # Target thread is gone
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+        self.stopped_at = time.monotonic()
+
+    def stop(self) -> str:
+        """Stop (if still running) and return the collapsed stacks"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def stats(self) -> dict:
+        end = self.stopped_at if not self.running else time.monotonic()
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "intervalMs": round(self.interval * 1000, 2),
+            "seconds": round(end - self.started_at, 2) if self.started_at else 0.0,
+            "stacks": len(self.stacks),
+        }
+
+
+class MemoryProfiler:
+    """tracemalloc session: allocations since a baseline, by source line"""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.started_at = 0.0
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        # Whether tracemalloc was already on when we started (leave it be)
+        self._external = False
+
+    @property
+    def running(self) -> bool:
+        return self.baseline is not None
+
+    def start(self, frames: int = MEMORY_FRAMES, max_seconds: float = MAX_MEMORY_SECONDS):
+        """Start tracing and take the baseline (call on the event loop)"""
+        if self.running:
+            raise RuntimeError("a memory profile is already running")
+        self._external = tracemalloc.is_tracing()
+        if not self._external:
+            tracemalloc.start(min(max(frames, 1), MAX_MEMORY_FRAMES))
+        self.baseline = tracemalloc.take_snapshot()
+        self.started_at = time.monotonic()
+        self._deadline = asyncio.get_running_loop().call_later(
+            min(max_seconds, MAX_MEMORY_SECONDS), self.stop)
+
+    def diff(self, top: int = 25, key: str = "lineno") -> dict:
+        """Largest allocation changes since the baseline"""
+        if not self.running:
+            raise RuntimeError("no memory profile is running")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        changes = snapshot.compare_to(self.baseline, key)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "seconds": round(time.monotonic() - self.started_at, 2),
+            "tracedKb": round(current / 1024, 1),
+            "peakKb": round(peak / 1024, 1),
+            "top": [
+                {
+                    "where": str(stat.traceback[0]) if stat.traceback else "?",
+                    "sizeDiffKb": round(stat.size_diff / 1024, 2),
+                    "sizeKb": round(stat.size / 1024, 2),
+                    "countDiff": stat.count_diff,
+                }
+                for stat in changes[:top]
+            ],
+        }
+
+    def stop(self):
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+        if self.running and not self._external:
+            tracemalloc.stop()
+        self.baseline = None
+
+
+async def loop_lag(seconds: float = 1.0, interval: float = LAG_INTERVAL) -> dict:
+    """Sleep repeatedly for interval and measure how late each wake-up is"""
+    interval = max(interval, MIN_SAMPLE_INTERVAL)
+    # At least one wake-up, however short the window
+    seconds = min(max(seconds, interval), MAX_LAG_SECONDS)
+    lags = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+    return {
+        "seconds": seconds,
+        "samples": len(lags),
+        "intervalMs": round(interval * 1000, 2),
+        "p50Ms": round(percentile(lags, 0.50), 3),
+        "p99Ms": round(percentile(lags, 0.99), 3),
+        "maxMs": round(max(lags), 3),
+        "meanMs": round(sum(lags) / len(lags), 3),
+    }
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Transcript Record / Replay
+Capture a live transcript stream, then replay it on a virtual clock
+
+Capture: start the server with RESOLVER_CAPTURE=<file> and every inbound
+transcript is appended to a compact log, one JSON array per line:
+  {"version": 1, "started": 1760000000.0}        header (wall-clock epoch)
+  [12.345, "conn-1", 1, "john chapter three"]     seconds, room, isFinal, text
+
+Replay: every transcript goes through the server's own pipeline (pipeline.py),
+but the rooms' clocks (debounce, STATE_TIMEOUT) and timer wheel (the chapter →
+verse 1 default) read a virtual clock that jumps from one recorded
+timestamp to the next. A 45-minute sermon replays in milliseconds and the
+same log always produces the same emissions. The regex tier of the
+cascade is replayed; the model tier (timing-dependent) is not, and every
+transcript is handled as if the ingest queue never had to coalesce.
+
+  python replay.py sermon.log                        # summary
+  python replay.py sermon.log --save expected.jsonl  # record emissions
+  python replay.py sermon.log --expect expected.jsonl  # exit 1 on any diff
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pipeline import process
+from resolver import CascadeResolver
+from rooms import Room
+from session import CHAPTER_TIMEOUT
+from timers import TimerWheel
+
+LOG_VERSION = 1
+
+
+class Recorder:
+    """Appends inbound transcripts to a capture log"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Line-buffered: a killed server still leaves every transcript on disk
+        self._file = open(path, "w", buffering=1)
+        self._start = time.monotonic()
+        self.recorded = 0
+        self._file.write(json.dumps({"version": LOG_VERSION, "started": time.time()}) + "\n")
+
+    def record(self, room_id: str, text: str, is_final: bool):
+        t = round(time.monotonic() - self._start, 3)
+        self._file.write(json.dumps([t, room_id, int(is_final), text], separators=(",", ":")) + "\n")
+        self.recorded += 1
+
+    def close(self):
+        self._file.close()
+        print(f"📼 Captured {self.recorded} transcripts to {self.path}")
+
+
+def read_log(path: Path) -> tuple[dict, Iterator[list]]:
+    """(header, events) of a capture log"""
+    f = open(path)
+    header = json.loads(f.readline())
+    if header.get("version") != LOG_VERSION:
+        raise ValueError(f"{path}: unsupported capture version {header.get('version')}")
+
+    def events():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, events()
+
+
+class VirtualClock:
+    """A clock that only moves when told to"""
+    __slots__ = ("now",)
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Replayer:
+    """Feeds recorded transcripts through per-room pipelines on virtual time"""
+
+    def __init__(self, started: float):
+        self.epoch = started
+        self.clock = VirtualClock(started)
+        self.timers = TimerWheel(clock=self.clock)
+        self.rooms: dict[str, Room] = {}
+        # Regex tier only: no model is attached
+        self.cascade = CascadeResolver()
+        # [seconds, room, message] in emission order
+        self.emissions: list[list] = []
+
+    def _room(self, room_id: str) -> Room:
+        room = self.rooms.get(room_id)
+        if room is None:
+            def emit(data: dict):
+                self._emit(room_id, {"type": "verse", **data, "confidence": 0.95})
+            room = self.rooms[room_id] = Room(room_id, emit, self.timers, self.clock)
+        return room
+
+    def _emit(self, room_id: str, message: dict):
+        self.emissions.append([round(self.clock.now - self.epoch, 3), room_id, message])
+
+    def advance(self, t: float):
+        """Move virtual time to epoch + t, firing timers as they fall due"""
+        target = self.epoch + t
+        clock, wheel = self.clock, self.timers
+        # Tick by tick while timers are pending, so each fires at its own time
+        while len(wheel) and clock.now + wheel.tick <= target:
+            clock.now += wheel.tick
+            wheel.advance()
+        clock.now = max(clock.now, target)
+        wheel.advance()
+
+    async def feed(self, t: float, room_id: str, text: str, is_final: bool):
+        self.advance(t)
+        await process(self.cascade, self._room(room_id), text, is_final, self._emit)
+
+    def finish(self):
+        """Let pending timers (e.g. a chapter's verse 1 default) fire"""
+        self.advance(self.clock.now - self.epoch + CHAPTER_TIMEOUT + self.timers.tick)
+
+
+def replay(path: Path) -> tuple[list[list], dict]:
+    """Emissions and run stats for one capture log"""
+    header, events = read_log(path)
+    replayer = Replayer(header["started"])
+    count = 0
+    last = 0.0
+
+    async def run():
+        nonlocal count, last
+        for t, room_id, is_final, text in events:
+            await replayer.feed(t, room_id, text, bool(is_final))
+            count += 1
+            last = t
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    replayer.finish()
+    elapsed = time.perf_counter() - start
+    return replayer.emissions, {
+        "transcripts": count,
+        "rooms": len(replayer.rooms),
+        "emissions": len(replayer.emissions),
+        "recordedSeconds": round(last, 1),
+        "replayMs": round(elapsed * 1000, 1),
+        "speedup": round(last / elapsed) if elapsed else None,
+    }
+
+
+def first_difference(actual: list[list], expected: list[list]) -> Optional[str]:
+    for i, (a, e) in enumerate(zip(actual, expected)):
+        if a != e:
+            return f"emission {i}: expected {e}, got {a}"
+    if len(actual) != len(expected):
+        return f"expected {len(expected)} emissions, got {len(actual)}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("log", type=Path, help="capture log (RESOLVER_CAPTURE)")
+    parser.add_argument("--save", type=Path, help="write emissions as JSONL")
+    parser.add_argument("--expect", type=Path, help="compare with emissions saved earlier")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own logging")
+    args = parser.parse_args()
+
+    with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+        emissions, stats = replay(args.log)
+
+    print(f"▶️ Replayed {stats['transcripts']} transcripts ({stats['recordedSeconds']}s recorded, "
+          f"{stats['rooms']} rooms) in {stats['replayMs']}ms → {stats['emissions']} emissions")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            for emission in emissions:
+                f.write(json.dumps(emission) + "\n")
+        print(f"📁 Emissions written to {args.save}")
+
+    if args.expect:
+        with open(args.expect) as f:
+            expected = [json.loads(line) for line in f if line.strip()]
+        diff = first_difference(emissions, expected)
+        if diff:
+            print(f"❌ Replay differs: {diff}")
+            sys.exit(1)
+        print(f"✅ Identical to {args.expect}")
+
+
+if __name__ == "__main__":
+    main()
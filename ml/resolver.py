@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 """
 Bible Reference Resolver
-Uses normalization + regex. Can be upgraded to ML later.
+Uses normalization + regex, with an optional ML tier behind it.
+
+CascadeResolver runs the regex tier first and answers immediately when it
+finds a confident, complete reference. Only partial or conflicting results
+escalate to the model tier, and only within a per-utterance deadline - so
+most traffic never pays model latency. Every answer reports its tier.
 """
 import re
 import json
 import sys
+import asyncio
+import time
+from typing import Optional, Union
 
-from normalize import normalize_text, extract_reference
+from normalize import extract_reference
 from aliases import BOOK_IDS
+from cache import memoize
+from metrics import STAGE_SECONDS
+from utterance import ParsedUtterance, parse_utterance
+from versification import is_valid
+
+# Tier names reported in the "tier" field
+TIER_REGEX = "regex"
+TIER_MODEL = "model"
+
+# Per-utterance budget for the whole cascade (seconds)
+DEADLINE = 0.25
+
+# Regex answers at or above this confidence never escalate
+CONFIDENT = 0.9
 
 
 def resolve(text: str) -> dict | None:
@@ -19,14 +41,46 @@ def resolve(text: str) -> dict | None:
     2. Extract book, chapter, verse
     3. Return structured reference
     """
-    # Use the new normalization + extraction
-    result = extract_reference(text)
+    result = _resolve_cached(text)
+    # Callers may add fields, so never hand out the cached dict itself
+    return dict(result) if result else None
+
+
+@memoize
+def _resolve_cached(text: str) -> dict | None:
+    return resolve_utterance(parse_utterance(text))
+
+
+def resolve_utterance(utterance: ParsedUtterance) -> dict | None:
+    """Resolve from an already parsed utterance"""
+    result = extract_from_utterance(utterance)
+    
+    if result:
+        return result
+    
+    # Substring match catches book names glued to noise ("exodush")
+    result = extract_reference(utterance.text)
     
     if result:
         return result
     
     # Fallback: try with minimal normalization
-    return extract_reference_fallback(text)
+    return extract_reference_fallback(utterance.text)
+
+
+def extract_from_utterance(utterance: ParsedUtterance) -> dict | None:
+    """Book + chapter (+ verse) straight from the parsed spans"""
+    if not utterance.book or not utterance.numbers:
+        return None
+    
+    numbers = utterance.numbers
+    return {
+        "book": utterance.book,
+        "bookId": BOOK_IDS[utterance.book],
+        "chapter": numbers[0],
+        "verse": numbers[1] if len(numbers) > 1 else None,
+        "confidence": 0.95
+    }
 
 
 def extract_reference_fallback(text: str) -> dict | None:
@@ -54,6 +108,96 @@ def extract_reference_fallback(text: str) -> dict | None:
     return None
 
 
+def is_ambiguous(utterance: ParsedUtterance, result: dict | None) -> bool:
+    """
+    True when the regex tier's answer is partial or conflicting:
+    no reference, a low-confidence fallback, a chapter or verse the book
+    doesn't have, a book the parse disagrees with, or more numbers than a
+    chapter:verse (that isn't a range).
+    """
+    if not result or result["confidence"] < CONFIDENT:
+        return True
+    if not is_valid(result["book"], result["chapter"], result.get("verse")):
+        return True
+    if utterance.book and utterance.book != result["book"]:
+        return True
+    if len(utterance.numbers) > 2 and not utterance.verse_range:
+        return True
+    return False
+
+
+class CascadeResolver:
+    """Regex tier first; the model tier only on ambiguity, under a deadline"""
+
+    def __init__(self, model=None, deadline: float = DEADLINE):
+        # Anything with `async resolve(text) -> dict | None` and a `ready`
+        # flag (MicroBatcher); may be attached once the model has loaded
+        self.model = model
+        self.deadline = deadline
+        # Metrics
+        self.answered = {TIER_REGEX: 0, TIER_MODEL: 0}
+        self.escalated = 0
+        self.timeouts = 0
+        self.unresolved = 0
+        self.out_of_range = 0
+
+    async def resolve(self, utterance: Union[ParsedUtterance, str],
+                      escalate: bool = True) -> Optional[dict]:
+        """
+        Resolve one utterance. Set escalate=False to stay on the regex
+        tier (e.g. for partial transcripts that will be re-sent).
+        """
+        start = time.perf_counter()
+        if isinstance(utterance, str):
+            utterance = parse_utterance(utterance)
+
+        result = resolve(utterance.text)
+        if (self.model is None or not self.model.ready or not escalate
+                or not is_ambiguous(utterance, result)):
+            return self._answer(result, TIER_REGEX)
+
+        remaining = self.deadline - (time.perf_counter() - start)
+        if remaining <= 0:
+            self.timeouts += 1
+            return self._answer(result, TIER_REGEX)
+
+        self.escalated += 1
+        model_start = time.perf_counter()
+        try:
+            ref = await asyncio.wait_for(self.model.resolve(utterance.text), remaining)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"⏱️ Model tier missed the {self.deadline * 1000:.0f}ms deadline")
+            ref = None
+        STAGE_SECONDS.observe("model", time.perf_counter() - model_start)
+
+        if ref:
+            return self._answer(ref, TIER_MODEL)
+        # Model had nothing better - keep the partial regex answer
+        return self._answer(result, TIER_REGEX)
+
+    def _answer(self, result: dict | None, tier: str) -> Optional[dict]:
+        if result and not is_valid(result["book"], result["chapter"], result.get("verse")):
+            # "John 30:99" - never hand the session a verse that doesn't exist
+            self.out_of_range += 1
+            result = None
+        if not result:
+            self.unresolved += 1
+            return None
+        self.answered[tier] += 1
+        return {**result, "tier": tier}
+
+    def stats(self) -> dict:
+        return {
+            "deadlineMs": round(self.deadline * 1000, 1),
+            "answered": dict(self.answered),
+            "escalated": self.escalated,
+            "timeouts": self.timeouts,
+            "unresolved": self.unresolved,
+            "outOfRange": self.out_of_range,
+        }
+
+
 def main():
     """CLI interface for testing"""
     if len(sys.argv) > 1:
@@ -0,0 +1,134 @@
+"""
+Room Registry
+One session manager + reference tracker per room or connection
+
+A room is keyed by the `room` query parameter on /resolve (several screens
+can share it), or by a per-connection ID when no room is given. Lookup is a
+dict access; idle rooms with no connected clients are evicted oldest-first.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from session import SessionManager
+from state_machine import ReferenceTracker
+from timers import TimerWheel
+
+# Evict rooms with no clients after 10 minutes of silence
+IDLE_TIMEOUT = 600.0
+
+
+class Room:
+    """Independent resolver state for one room"""
+    __slots__ = ("room_id", "session", "tracker", "clients", "last_seen")
+
+    def __init__(self, room_id: str, emit_callback: Optional[Callable] = None,
+                 timers: Optional[TimerWheel] = None,
+                 clock: Callable[[], float] = time.time):
+        self.room_id = room_id
+        self.session = SessionManager(emit_callback, timers, clock)
+        self.tracker = ReferenceTracker(clock)
+        self.clients = 0
+        self.last_seen = time.monotonic()
+
+    def reset(self):
+        """Reset session and reference state"""
+        self.session.reset()
+        self.tracker.reset()
+
+    def close(self):
+        """Cancel the session's pending timers"""
+        self.session.close()
+
+    def to_dict(self) -> dict:
+        return {
+            "room": self.room_id,
+            "clients": self.clients,
+            "idle": round(time.monotonic() - self.last_seen, 1),
+            "session": self.session.session.to_dict(),
+            "state": self.tracker.state.to_dict(),
+        }
+
+
+class RoomRegistry:
+    """Rooms ordered by last activity for O(1) lookup and cheap eviction"""
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT,
+                 emit_factory: Optional[Callable[[str], Callable]] = None):
+        self.idle_timeout = idle_timeout
+        # Builds the emit callback for a new room from its ID
+        self.emit_factory = emit_factory
+        self._rooms: OrderedDict[str, Room] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._rooms
+
+    def get(self, room_id: str) -> Optional[Room]:
+        """Look up a room without creating it"""
+        return self._rooms.get(room_id)
+
+    def touch(self, room_id: str) -> Room:
+        """Get or create a room and mark it as recently active"""
+        room = self._rooms.get(room_id)
+        if room is None:
+            emit = self.emit_factory(room_id) if self.emit_factory else None
+            room = Room(room_id, emit)
+            self._rooms[room_id] = room
+        else:
+            self._rooms.move_to_end(room_id)
+        room.last_seen = time.monotonic()
+        return room
+
+    def join(self, room_id: str) -> Room:
+        """Register a client on a room"""
+        self.evict_idle()
+        room = self.touch(room_id)
+        room.clients += 1
+        return room
+
+    def leave(self, room_id: str):
+        """Unregister a client; the room lingers until it idles out"""
+        room = self._rooms.get(room_id)
+        if room is not None:
+            room.clients = max(0, room.clients - 1)
+            self.touch(room_id)
+
+    def remove(self, room_id: str):
+        """Drop a room immediately"""
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            room.reset()
+
+    def latest(self) -> Optional[Room]:
+        """Most recently active room"""
+        if not self._rooms:
+            return None
+        return next(reversed(self._rooms.values()))
+
+    def evict_idle(self, now: Optional[float] = None) -> list[str]:
+        """Evict rooms with no clients that have been idle too long"""
+        now = time.monotonic() if now is None else now
+        evicted = []
+        # Oldest first; stop at the first room that is still fresh
+        for room_id, room in self._rooms.items():
+            if now - room.last_seen <= self.idle_timeout:
+                break
+            if room.clients == 0:
+                evicted.append(room_id)
+        for room_id in evicted:
+            self.remove(room_id)
+        if evicted:
+            print(f"🧹 Evicted idle rooms: {', '.join(evicted)}")
+        return evicted
+
+    def rooms(self) -> list[Room]:
+        return list(self._rooms.values())
+
+    def close(self):
+        """Drop every room, cancelling their timers (on shutdown)"""
+        for room in self._rooms.values():
+            room.close()
+        self._rooms.clear()
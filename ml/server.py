@@ -3,116 +3,444 @@
 ML Resolver WebSocket Server
 Uses session manager for advanced preaching behaviors
 """
+# Set before the other imports so /health can report how long they took
+import time
+PROCESS_START = time.perf_counter()
+
 import json
 import asyncio
 import re
 import os
+import itertools
+import secrets
+import contextlib
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, HTTPException, Depends, Query, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from normalize import normalize_text
-from state_machine import update_reference, reset_state, get_current_state
-from session import (
-    process_text, 
-    get_session, 
-    reset_session, 
-    set_emit_callback,
-    is_next_command,
+from utterance import parse_utterance
+from rooms import RoomRegistry, Room
+from events import BUS
+from fanout import FanOut
+from ingest import IngestQueue, make_transcript
+from resolver import resolve, CascadeResolver
+from cache import cache_stats
+from inference import MicroBatcher, ModelLoader, available_backends, WARMUP_TEXTS
+from workers import WorkerPool
+from procstats import rss_mb
+from replay import Recorder
+from tracing import TRACES
+from pipeline import process
+from profiling import (
+    SamplingProfiler, MemoryProfiler, loop_lag,
+    SAMPLE_INTERVAL, MAX_PROFILE_SECONDS, MEMORY_FRAMES, MAX_MEMORY_SECONDS,
+)
+from metrics import (
+    REGISTRY, STAGE_SECONDS, TRANSCRIPT_SECONDS, TRANSCRIPTS, FAILURES, ERRORS,
 )
-from resolver import resolve
 
-app = FastAPI(title="Bible Resolver ML Service")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up and start the model on startup; close rooms, model and capture on shutdown"""
+    await start_model()
+    yield
+    await stop_workers()
+
+
+app = FastAPI(title="Bible Resolver ML Service", lifespan=lifespan)
+
+# Admin endpoints (profiling) are same-origin only
+ADMIN_PREFIX = "/admin"
+
+
+class PublicCORSMiddleware(CORSMiddleware):
+    """CORS for everything except /admin, so no web page can drive those"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(ADMIN_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
 
 # CORS for development
 app.add_middleware(
-    CORSMiddleware,
+    PublicCORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Check if trained model exists
-MODEL_PATH = Path(__file__).parent / "model"
-USE_ML = MODEL_PATH.exists() and (MODEL_PATH / "config.json").exists()
+# Check if a trained model exists (fastest available backend by default).
+# Nothing heavy happens at import: the regex/session path serves as soon as
+# uvicorn binds, and the model loads and warms up in the background.
+MODEL_BACKEND = os.environ.get("RESOLVER_BACKEND", "auto")  # auto | classifier | onnx | t5
+# Model processes; 0 runs the model in this process (executor thread)
+MODEL_WORKERS = int(os.environ.get("RESOLVER_WORKERS", "0"))
+# Record every inbound transcript to this file for replay.py
+CAPTURE_PATH = os.environ.get("RESOLVER_CAPTURE")
+# /admin endpoints require this value in X-Admin-Token (disabled when unset)
+ADMIN_TOKEN = os.environ.get("RESOLVER_ADMIN_TOKEN")
+USE_ML = bool(available_backends())
+pool = None
+loader = None
+batcher = None
 
-if USE_ML:
-    print("🧠 Loading trained ML model...")
-    from transformers import T5Tokenizer, T5ForConditionalGeneration
-    import torch
-    
-    tokenizer = T5Tokenizer.from_pretrained(str(MODEL_PATH))
-    model = T5ForConditionalGeneration.from_pretrained(str(MODEL_PATH))
-    model.eval()
-    print("✅ ML model loaded")
+if USE_ML and MODEL_WORKERS:
+    kind = available_backends()[0] if MODEL_BACKEND == "auto" else MODEL_BACKEND
+    print(f"🧠 Serving {kind} model from {MODEL_WORKERS} worker processes...")
+    pool = WorkerPool(kind, MODEL_WORKERS)
+    batcher = MicroBatcher(pool)
+elif USE_ML:
+    loader = ModelLoader(MODEL_BACKEND)
 else:
     print("⚠️ No trained model found, using session manager + regex")
-    tokenizer = None
-    model = None
 
+# Regex tier first, model tier only on ambiguity within the deadline
+# (a pool's batcher reports not-ready until a worker has loaded)
+cascade = CascadeResolver(model=batcher)
 
-# Active WebSocket connections for broadcasting
-active_connections: list[WebSocket] = []
+# Startup timeline and first-request latencies, reported by /health
+startup = {
+    "importSeconds": round(time.perf_counter() - PROCESS_START, 3),
+    "servingSeconds": None,
+    "modelReadySeconds": None,
+    "regexColdMs": None,
+    "regexWarmMs": None,
+    "modelMs": None,
+}
 
 
-async def broadcast_session(data: dict):
-    """Broadcast session update to all connected clients"""
-    message = json.dumps({"type": "session", **data})
-    for ws in active_connections:
-        try:
-            await ws.send_text(message)
-        except:
-            pass
+def _time_ms(fn, texts) -> float:
+    """Mean milliseconds per text"""
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return round((time.perf_counter() - start) * 1000 / len(texts), 3)
+
+
+async def load_model():
+    """Background: load + warm the in-process model, then enable its tier"""
+    global batcher
+    print("🧠 Loading trained ML model in the background...")
+    backend = await loader.load()
+    if backend is None:
+        return
+    batcher = MicroBatcher(backend)
+    cascade.model = batcher
+
+    start = time.perf_counter()
+    for text in WARMUP_TEXTS:
+        await batcher.resolve(text)
+    startup["modelMs"] = round((time.perf_counter() - start) * 1000 / len(WARMUP_TEXTS), 3)
+    startup["modelReadySeconds"] = round(time.perf_counter() - PROCESS_START, 3)
+
+
+async def start_model():
+    startup["servingSeconds"] = round(time.perf_counter() - PROCESS_START, 3)
+    # First call pays parsing/lexicon costs and fills the caches
+    startup["regexColdMs"] = _time_ms(resolve, WARMUP_TEXTS)
+    startup["regexWarmMs"] = _time_ms(resolve, WARMUP_TEXTS)
+
+    if pool:
+        # Workers load and warm up in their own processes
+        await pool.start()
+    elif loader:
+        asyncio.create_task(load_model())
+
 
+async def stop_workers():
+    # Rooms first, so no session timer fires into a closing server
+    rooms.close()
+    if batcher:
+        batcher.shutdown()
+    if pool:
+        await pool.close()
+    if recorder:
+        recorder.close()
+    cpu_profiler.stop()
+    memory_profiler.stop()
 
-def sync_emit_callback(data: dict):
-    """Sync callback for session manager - schedules async broadcast"""
-    # This runs in a thread, so we need to schedule the async broadcast
-    # For now, we'll just print - the WebSocket handler will emit
-    print(f"📖 Session update ready: {data}")
 
 
-# Set up session callback
-set_emit_callback(sync_emit_callback)
+def room_emit_callback(room_id: str):
+    """Build the session callback for one room: publish to its topic"""
+    def emit(data: dict):
+        publish_verse(room_id, {
+            "type": "verse",
+            **data,
+            "confidence": 0.95,
+        })
+    return emit
+
+
+def publish_verse(room_id: str, payload: dict):
+    """Publish to a room, tracing the emit for the transcript being handled"""
+    start = time.perf_counter()
+    BUS.publish(room_id, payload)
+    trace = TRACES.current
+    if trace is not None:
+        trace.span("emit", start, time.perf_counter(),
+                   f"{payload['book']} {payload['chapter']}:{payload.get('verse') or ''}")
+
+
+# Per-room session state; connections without ?room= get a private room
+rooms = RoomRegistry(emit_factory=room_emit_callback)
+_connection_ids = itertools.count(1)
+
+# Per-client outbound queues and drain tasks
+fanout = FanOut()
+
+# client_id -> inbound transcript buffer
+ingest: dict[str, IngestQueue] = {}
+
+recorder = Recorder(Path(CAPTURE_PATH)) if CAPTURE_PATH else None
+
+
+def _find_room(room_id: str | None):
+    """Requested room, or the most recently active one"""
+    if room_id:
+        return rooms.get(room_id)
+    return rooms.latest()
 
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "ml_enabled": USE_ML}
+    model_ready = bool(batcher and batcher.ready)
+    return {
+        "status": "ok",
+        "ready": True,  # regex/session tier serves from the first request
+        "modelReady": model_ready,
+        "tiers": ["regex", "model"] if model_ready else ["regex"],
+        "ml_enabled": USE_ML,
+        "model": loader.stats() if loader else None,
+        "startup": startup,
+        "events": BUS.stats(),
+        "inference": batcher.stats() if batcher else None,
+        "cascade": cascade.stats(),
+        "workers": pool.stats() if pool else None,
+        "process": {"pid": os.getpid(), "rssMb": round(rss_mb(), 1)},
+    }
+
+
+def _cache_counts(field: str) -> dict:
+    return {name.rsplit(".", 1)[-1]: s[field] for name, s in cache_stats().items()}
+
+
+# Read at scrape time from the components that already count them
+REGISTRY.collect("resolver_emits_total", "Verse updates published", lambda: BUS.published, kind="counter")
+REGISTRY.collect("resolver_cache_hits_total", "Resolver cache hits", lambda: _cache_counts("hits"),
+                 kind="counter", label="cache")
+REGISTRY.collect("resolver_cache_misses_total", "Resolver cache misses", lambda: _cache_counts("misses"),
+                 kind="counter", label="cache")
+REGISTRY.collect("resolver_ingest_queue_depth", "Transcripts waiting to be resolved",
+                 lambda: sum(len(q) for q in ingest.values()))
+REGISTRY.collect("resolver_outbound_queue_depth", "Updates waiting to be sent",
+                 lambda: sum(c["queued"] for c in fanout.stats()))
+REGISTRY.collect("resolver_clients", "Connected websocket clients", lambda: len(fanout))
+REGISTRY.collect("resolver_rooms", "Live rooms", lambda: len(rooms))
+REGISTRY.collect("resolver_model_pending", "Transcripts waiting for a model batch",
+                 lambda: batcher.stats()["pending"] if batcher else 0)
+REGISTRY.collect("process_resident_memory_bytes", "Resident memory size in bytes",
+                 lambda: int(rss_mb() * 1024 * 1024))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/traces")
+async def debug_traces(limit: int = 50, room: str | None = None,
+                       min_ms: float = 0.0, outcome: str | None = None):
+    """Most recent utterance traces, newest first"""
+    return TRACES.query(limit, room, min_ms, outcome)
+
+
+@app.get("/debug/traces/{trace_id}")
+async def debug_trace(trace_id: str):
+    trace = TRACES.get(trace_id)
+    return trace.to_dict() if trace else None
+
+
+# ─── Admin: live profiling (bounded duration, nothing runs until asked) ───
+
+cpu_profiler = SamplingProfiler()
+memory_profiler = MemoryProfiler()
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled (set RESOLVER_ADMIN_TOKEN)")
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="admin token required")
+
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def profile_start(interval_ms: float = SAMPLE_INTERVAL * 1000,
+                        max_seconds: float = MAX_PROFILE_SECONDS):
+    """Start sampling the event loop thread's stack"""
+    try:
+        # Handlers run on the loop thread, so that's the one sampled
+        cpu_profiler.start(interval=interval_ms / 1000, max_seconds=max_seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    print(f"🔬 CPU profile started ({cpu_profiler.interval * 1000:g}ms interval)")
+    return cpu_profiler.stats()
+
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def profile_stop():
+    """Stop sampling; returns collapsed stacks (flamegraph.pl / speedscope)"""
+    collapsed = cpu_profiler.stop()
+    stats = cpu_profiler.stats()
+    print(f"🔬 CPU profile stopped: {stats['samples']} samples")
+    return PlainTextResponse(collapsed, headers={
+        "Content-Disposition": "attachment; filename=resolver.collapsed",
+        "X-Profile-Samples": str(stats["samples"]),
+    })
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_status():
+    return cpu_profiler.stats()
+
+
+@app.post("/admin/memory/start", dependencies=[Depends(require_admin)])
+async def memory_start(frames: int = MEMORY_FRAMES, max_seconds: float = MAX_MEMORY_SECONDS):
+    """Start tracemalloc and take the baseline snapshot"""
+    try:
+        memory_profiler.start(frames, max_seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    print("🔬 tracemalloc started")
+    return {"running": True}
+
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(top: int = 25, key: str = "lineno"):
+    """Top allocation changes since /admin/memory/start"""
+    if key not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="key must be lineno, filename or traceback")
+    try:
+        return memory_profiler.diff(top, key)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/admin/memory/stop", dependencies=[Depends(require_admin)])
+async def memory_stop():
+    memory_profiler.stop()
+    print("🔬 tracemalloc stopped")
+    return {"running": False}
+
+
+@app.get("/admin/loop-lag", dependencies=[Depends(require_admin)])
+async def admin_loop_lag(seconds: float = Query(1.0, ge=0), interval_ms: float = Query(10.0, gt=0)):
+    """Event loop wake-up delay measured over a short window"""
+    return await loop_lag(seconds, interval_ms / 1000)
 
 
 @app.get("/state")
-async def state():
+async def state(room: str | None = None):
     """Get current state machine state"""
-    s = get_current_state()
-    return s.to_dict()
+    r = _find_room(room)
+    return r.tracker.state.to_dict() if r else None
 
 
 @app.get("/session")
-async def session():
+async def session(room: str | None = None):
     """Get current session state"""
-    s = get_session()
-    return s.to_dict()
+    r = _find_room(room)
+    return r.session.session.to_dict() if r else None
+
+
+@app.get("/rooms")
+async def list_rooms():
+    """All live rooms, most recently active last"""
+    return [r.to_dict() for r in rooms.rooms()]
+
+
+@app.get("/cache")
+async def cache():
+    """Hit/miss counters for the normalization/resolution caches"""
+    return cache_stats()
+
+
+@app.get("/clients")
+async def list_clients():
+    """Per-client send lag, queue and ingest metrics"""
+    clients = fanout.stats()
+    for c in clients:
+        queue = ingest.get(c["client"])
+        c["ingest"] = queue.stats() if queue is not None else None
+    return clients
 
 
 @app.post("/reset")
-async def reset():
-    """Reset state machine and session"""
-    reset_state()
-    reset_session()
+async def reset(room: str | None = None):
+    """Reset state machine and session (one room, or all)"""
+    targets = [rooms.get(room)] if room else rooms.rooms()
+    for r in targets:
+        if r:
+            r.reset()
     return {"status": "reset"}
 
 
+async def process_transcripts(room: Room, queue: IngestQueue):
+    """Resolve a connection's transcripts as fast as they can be consumed"""
+    async for item in queue:
+        trace = item.trace
+        outcome = "failed"
+        if trace is not None:
+            trace.span("queue", item.received_at, time.perf_counter())
+        try:
+            rooms.touch(room.room_id)
+            if await process(cascade, room, item.text, item.is_final, publish_verse, trace):
+                # Resolving steps set their own outcome
+                outcome = "ignored"
+                continue
+            # Log failed resolutions
+            FAILURES.inc()
+            normalized = parse_utterance(item.text).normalized
+            with open("failures.log", "a") as f:
+                f.write(f"{item.text} | normalized: {normalized}\n")
+        except Exception as e:
+            ERRORS.inc()
+            outcome = "error"
+            print(f"❌ Failed to resolve '{item.text}': {e}")
+        finally:
+            end = time.perf_counter()
+            TRANSCRIPT_SECONDS.observe(None, end - item.received_at)
+            if trace is not None:
+                trace.finish(trace.outcome or outcome, end)
+
+
 @app.websocket("/resolve")
 async def resolver_ws(ws: WebSocket):
     await ws.accept()
-    active_connections.append(ws)
-    print("🔌 ML Resolver client connected")
     
-    # Reset session for new connection
-    reset_session()
-    reset_state()
+    # Named rooms are shared between clients; otherwise the connection
+    # gets a fresh private room
+    client_id = f"conn-{next(_connection_ids)}"
+    requested = ws.query_params.get("room")
+    private = not requested
+    room_id = requested or client_id
+    room = rooms.join(room_id)
+    
+    # Only the newest verse matters to a screen, so backlog coalesces
+    fanout.attach(client_id, ws, BUS.subscribe(room_id, coalesce=True))
+    
+    # Reader buffers into the ingest queue; a separate task resolves
+    queue = IngestQueue()
+    ingest[client_id] = queue
+    processor = asyncio.create_task(process_transcripts(room, queue))
+    print(f"🔌 ML Resolver client connected (room {room_id})")
     
     try:
         while True:
@@ -126,42 +454,33 @@ async def resolver_ws(ws: WebSocket):
             if len(text) < 2:
                 continue
             
-            # Process through session manager first
-            session_result = process_text(text)
-            
-            if session_result and session_result.get("book"):
-                # Session manager handled it
-                await ws.send_text(json.dumps({
-                    "type": "verse",
-                    **session_result,
-                    "confidence": 0.95,
-                }))
-                print(f"🎯 Session: {session_result.get('book')} {session_result.get('chapter')}:{session_result.get('verse')}")
-            else:
-                # Fallback to state machine
-                normalized = normalize_text(text)
-                result = update_reference(normalized)
-                
-                if result and result.get("book") and result.get("chapter"):
-                    await ws.send_text(json.dumps({
-                        "type": "verse",
-                        **result
-                    }))
-                    print(f"🎯 Resolved: {result['book']} {result['chapter']}:{result.get('verse', '')}")
-                else:
-                    # Log failed resolutions
-                    if len(text) > 5 and not is_next_command(text):
-                        with open("failures.log", "a") as f:
-                            f.write(f"{text} | normalized: {normalized}\n")
+            is_final = bool(data.get("isFinal"))
+            TRANSCRIPTS.inc("final" if is_final else "partial")
+            if recorder:
+                recorder.record(room_id, text, is_final)
+            start = time.perf_counter()
+            trace = TRACES.start(room_id, text, is_final, start)
+            transcript = make_transcript(text, is_final, trace)
+            # Normalization + parsing happen here (the result is cached)
+            STAGE_SECONDS.observe("normalize", time.perf_counter() - start)
+            await queue.put(transcript)
     
     except WebSocketDisconnect:
-        print("🔌 Client disconnected")
-        active_connections.remove(ws)
-        reset_session()
+        print(f"🔌 Client disconnected (room {room_id})")
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
-        if ws in active_connections:
-            active_connections.remove(ws)
+        # Tell the client instead of leaving it on a dead connection
+        with contextlib.suppress(Exception):
+            await ws.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        queue.close()
+        processor.cancel()
+        ingest.pop(client_id, None)
+        fanout.detach(client_id)
+        if private:
+            rooms.remove(room_id)
+        else:
+            rooms.leave(room_id)
 
 
 if __name__ == "__main__":
@@ -6,17 +6,22 @@ Handles advanced preaching behaviors:
 3. Auto-advance on "next"/"continue" commands
 4. Explicit verse jump
 """
-import re
 import time
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import Optional, Callable
-import threading
 
 from aliases import BOOK_IDS
-from normalize import normalize_text
+from utterance import (
+    ParsedUtterance,
+    parse_utterance,
+    detect_range,
+    NEXT_COMMANDS,
+    PREVIOUS_COMMANDS,
+)
+from timers import TIMERS, TimerWheel, TimerHandle
 
 
-@dataclass
+@dataclass(slots=True)
 class ScriptureSession:
     """Holds the current scripture reading session state"""
     book: Optional[str] = None
@@ -76,209 +81,283 @@ class ScriptureSession:
         }
 
 
-# Global session
-_session = ScriptureSession()
-
-# Chapter timer for auto-defaulting to verse 1
-_chapter_timer: Optional[threading.Timer] = None
-
-# Callback for emitting updates
-_emit_callback: Optional[Callable] = None
-
-
-# Commands that trigger "next"
-NEXT_COMMANDS = [
-    "next verse",
-    "next",
-    "continue",
-    "go on",
-    "keep going",
-    "move on",
-]
-
-# Commands that trigger "previous"
-PREVIOUS_COMMANDS = [
-    "previous verse",
-    "previous",
-    "go back",
-    "back",
-    "last verse",
-    "before",
-]
-
 # Command debounce (in seconds)
 COMMAND_DEBOUNCE = 0.8
-_last_command_time: float = 0.0
 
-
-def set_emit_callback(callback: Callable):
-    """Set the callback for emitting session updates"""
-    global _emit_callback
-    _emit_callback = callback
+# Wait this long after "book + chapter" before defaulting to verse 1
+CHAPTER_TIMEOUT = 3.0
 
 
-def emit_session():
-    """Emit current session to frontend"""
-    if _emit_callback and _session.book and _session.chapter:
-        _emit_callback(_session.to_dict())
-        print(f"📖 Session: {_session.to_reference_string()}")
-
-
-def _cancel_chapter_timer():
-    """Cancel pending chapter timer"""
-    global _chapter_timer
-    if _chapter_timer:
-        _chapter_timer.cancel()
-        _chapter_timer = None
-
-
-def _on_chapter_timeout():
-    """Called when chapter timer expires - default to verse 1"""
-    global _session
-    if _session.book and _session.chapter and _session.current_verse is None:
-        _session.current_verse = 1
-        _session.start_verse = 1
-        _session.is_range_mode = False
-        print(f"⏱️ Auto-defaulting to verse 1: {_session.to_reference_string()}")
-        emit_session()
-
-
-def on_book_detected(book: str):
-    """Handle new book detection"""
-    global _session
-    _cancel_chapter_timer()
-    
-    _session = ScriptureSession(
-        book=book,
-        chapter=None,
-        last_updated=time.time()
+class SessionManager:
+    """
+    Session state machine for one room.
+    Each room (or connection) owns its own manager, so several streams can
+    be served by one process without cross-talk.
+    """
+    __slots__ = (
+        "session",
+        "chapter_timer",
+        "timers",
+        "last_command_time",
+        "emit_callback",
+        "clock",
+        "last_branch",
     )
-    print(f"📚 Book detected: {book}")
 
+    def __init__(self, emit_callback: Optional[Callable] = None,
+                 timers: Optional[TimerWheel] = None,
+                 clock: Callable[[], float] = time.time):
+        self.session = ScriptureSession()
+        # Wall clock for timestamps and debounce (virtual in replays)
+        self.clock = clock
+        # Which case process_utterance took last (for tracing)
+        self.last_branch = None
+        # Chapter timer for auto-defaulting to verse 1, on the shared wheel
+        self.chapter_timer: Optional[TimerHandle] = None
+        self.timers = timers if timers is not None else TIMERS
+        self.last_command_time = 0.0
+        # Callback for emitting updates
+        self.emit_callback = emit_callback
+
+    def emit_session(self):
+        """Emit current session to frontend"""
+        session = self.session
+        if self.emit_callback and session.book and session.chapter:
+            self.emit_callback(session.to_dict())
+            print(f"📖 Session: {session.to_reference_string()}")
+
+    def _cancel_chapter_timer(self):
+        """Cancel pending chapter timer"""
+        if self.chapter_timer:
+            self.chapter_timer.cancel()
+            self.chapter_timer = None
+
+    def _on_chapter_timeout(self):
+        """Called when chapter timer expires - default to verse 1"""
+        self.chapter_timer = None
+        session = self.session
+        # Any verse, range or command cancels the timer, so still being on
+        # the chapter means no verse was spoken
+        if session.book and session.chapter:
+            session.current_verse = 1
+            session.start_verse = 1
+            session.is_range_mode = False
+            print(f"⏱️ Auto-defaulting to verse 1: {session.to_reference_string()}")
+            self.emit_session()
+
+    def on_book_detected(self, book: str):
+        """Handle new book detection"""
+        self._cancel_chapter_timer()
+        
+        self.session = ScriptureSession(
+            book=book,
+            chapter=None,
+            last_updated=self.clock()
+        )
+        print(f"📚 Book detected: {book}")
+
+    def on_chapter_detected(self, book: str, chapter: int):
+        """Handle chapter detection - start timer for verse"""
+        self._cancel_chapter_timer()
+        
+        session = self.session
+        session.book = book
+        session.chapter = chapter
+        session.current_verse = 1  # Default, but don't emit yet
+        session.is_range_mode = False
+        session.last_updated = self.clock()
+        
+        print(f"📑 Chapter detected: {book} {chapter} (waiting {CHAPTER_TIMEOUT:g}s for verse...)")
+        
+        # Start timer - if no verse comes in 3s, default to verse 1
+        self.chapter_timer = self.timers.call_later(CHAPTER_TIMEOUT, self._on_chapter_timeout)
 
-def on_chapter_detected(book: str, chapter: int):
-    """Handle chapter detection - start 2s timer for verse"""
-    global _session, _chapter_timer
-    
-    _cancel_chapter_timer()
-    
-    _session.book = book
-    _session.chapter = chapter
-    _session.current_verse = 1  # Default, but don't emit yet
-    _session.is_range_mode = False
-    _session.last_updated = time.time()
-    
-    print(f"📑 Chapter detected: {book} {chapter} (waiting 2s for verse...)")
-    
-    # Start timer - if no verse comes in 3s, default to verse 1
-    _chapter_timer = threading.Timer(3.0, _on_chapter_timeout)
-    _chapter_timer.start()
+    def on_verse_detected(self, book: str, chapter: int, verse: int):
+        """Handle single verse detection"""
+        # Cancel chapter timer since we got a verse
+        self._cancel_chapter_timer()
+        
+        session = self.session
+        session.book = book
+        session.chapter = chapter
+        session.current_verse = verse
+        session.start_verse = verse
+        session.end_verse = None
+        session.is_range_mode = False
+        session.last_updated = self.clock()
+        
+        self.emit_session()
 
+    def on_range_detected(self, book: str, chapter: int, start: int, end: int):
+        """Handle verse range detection (e.g., 'verses 4 to 9')"""
+        self._cancel_chapter_timer()
+        
+        session = self.session
+        session.book = book
+        session.chapter = chapter
+        session.start_verse = start
+        session.end_verse = end
+        session.current_verse = start
+        session.is_range_mode = True
+        session.last_updated = self.clock()
+        
+        print(f"📖 Range detected: {book} {chapter}:{start}-{end}")
+        self.emit_session()
+
+    def on_explicit_verse(self, verse: int):
+        """Handle explicit verse jump (e.g., 'verse 7')"""
+        session = self.session
+        if not session.book or not session.chapter:
+            return
+        
+        self._cancel_chapter_timer()
+        
+        session.current_verse = verse
+        session.start_verse = verse
+        session.end_verse = None
+        session.is_range_mode = False
+        session.last_updated = self.clock()
+        
+        self.emit_session()
+
+    def on_next_command(self):
+        """Handle 'next'/'continue' command"""
+        session = self.session
+        if session.book and session.chapter and session.current_verse:
+            self._cancel_chapter_timer()
+            session.current_verse += 1
+            session.start_verse = session.current_verse
+            session.end_verse = session.current_verse
+            session.is_range_mode = False
+            session.last_updated = self.clock()
+            print(f"⏭️ Advancing to verse {session.current_verse}")
+            self.emit_session()
+
+    def on_previous_command(self):
+        """Handle 'previous'/'go back' command"""
+        session = self.session
+        if session.book and session.chapter and session.current_verse and session.current_verse > 1:
+            self._cancel_chapter_timer()
+            session.current_verse -= 1
+            session.start_verse = session.current_verse
+            session.end_verse = session.current_verse
+            session.is_range_mode = False
+            session.last_updated = self.clock()
+            print(f"⏮️ Going back to verse {session.current_verse}")
+            self.emit_session()
+
+    def apply_reference(self, book: str, chapter: int, verse: Optional[int] = None):
+        """Apply a reference resolved outside the session (e.g. the ML model)"""
+        if verse:
+            self.on_verse_detected(book, chapter, verse)
+        else:
+            self.on_chapter_detected(book, chapter)
 
-def on_verse_detected(book: str, chapter: int, verse: int):
-    """Handle single verse detection"""
-    global _session
-    
-    # Cancel chapter timer since we got a verse
-    _cancel_chapter_timer()
-    
-    _session.book = book
-    _session.chapter = chapter
-    _session.current_verse = verse
-    _session.start_verse = verse
-    _session.end_verse = None
-    _session.is_range_mode = False
-    _session.last_updated = time.time()
-    
-    emit_session()
+    def check_command_debounce(self) -> bool:
+        """Check if enough time has passed since last command"""
+        now = self.clock()
+        if now - self.last_command_time < COMMAND_DEBOUNCE:
+            print("⏭️ Command debounced (too fast)")
+            return False
+        self.last_command_time = now
+        return True
+
+    def process_text(self, text: str) -> Optional[dict]:
+        """
+        Process incoming text and update session.
+        Returns session dict if update occurred, None otherwise.
+        """
+        return self.process_utterance(parse_utterance(text))
+
+    def process_utterance(self, utterance: ParsedUtterance) -> Optional[dict]:
+        """
+        Update session from an already parsed utterance.
+        Returns session dict if update occurred, None otherwise.
+        """
+        # Check for next/continue commands (with debounce)
+        if utterance.is_next:
+            if self.check_command_debounce():
+                self.last_branch = "next"
+                print("⏭️ Next command detected")
+                self.on_next_command()
+                return self.session.to_dict() if self.session.book else None
+            self.last_branch = "next_debounced"
+            return None
+        
+        # Check for previous/back commands (with debounce)
+        if utterance.is_previous:
+            if self.check_command_debounce():
+                self.last_branch = "previous"
+                print("⏮️ Previous command detected")
+                self.on_previous_command()
+                return self.session.to_dict() if self.session.book else None
+            self.last_branch = "previous_debounced"
+            return None
+        
+        session = self.session
+        book = utterance.book
+        numbers = utterance.numbers
+        verse_range = utterance.verse_range
+        
+        # Handle different cases
+        if book and len(numbers) >= 1:
+            chapter = numbers[0]
+            
+            if verse_range:
+                # Range detected: "Genesis 1:4-9"
+                self.last_branch = "range"
+                self.on_range_detected(book, chapter, verse_range[0], verse_range[1])
+                return self.session.to_dict()
+            elif len(numbers) >= 2:
+                # Book + chapter + verse
+                self.last_branch = "verse"
+                self.on_verse_detected(book, chapter, numbers[1])
+                return self.session.to_dict()
+            else:
+                # Book + chapter only - start timer
+                self.last_branch = "chapter"
+                self.on_chapter_detected(book, chapter)
+                return None  # Don't emit yet, wait for timer
+        
+        elif session.book and session.chapter:
+            # No book in text, but we have active session
+            
+            if verse_range:
+                self.last_branch = "session_range"
+                self.on_range_detected(session.book, session.chapter, verse_range[0], verse_range[1])
+                return self.session.to_dict()
+            
+            # "verse X", or a lone number spoken with "verse"
+            if utterance.explicit_verse is not None:
+                self.last_branch = "explicit_verse"
+                self.on_explicit_verse(utterance.explicit_verse)
+                return self.session.to_dict()
+        
+        self.last_branch = "none"
+        return None
 
+    def close(self):
+        """Cancel pending timers (the manager may be dropped afterwards)"""
+        self._cancel_chapter_timer()
 
-def on_range_detected(book: str, chapter: int, start: int, end: int):
-    """Handle verse range detection (e.g., 'verses 4 to 9')"""
-    global _session
-    
-    _cancel_chapter_timer()
-    
-    _session.book = book
-    _session.chapter = chapter
-    _session.start_verse = start
-    _session.end_verse = end
-    _session.current_verse = start
-    _session.is_range_mode = True
-    _session.last_updated = time.time()
-    
-    print(f"📖 Range detected: {book} {chapter}:{start}-{end}")
-    emit_session()
+    def reset(self):
+        """Reset the session"""
+        self.close()
+        self.session = ScriptureSession()
 
 
-def on_explicit_verse(verse: int):
-    """Handle explicit verse jump (e.g., 'verse 7')"""
-    global _session
-    
-    if not _session.book or not _session.chapter:
-        return
-    
-    _cancel_chapter_timer()
-    
-    _session.current_verse = verse
-    _session.start_verse = verse
-    _session.end_verse = None
-    _session.is_range_mode = False
-    _session.last_updated = time.time()
-    
-    emit_session()
+# Default manager used by the module-level API (CLI tests, single-room use)
+_default = SessionManager()
 
 
-def on_next_command():
-    """Handle 'next'/'continue' command"""
-    global _session
-    
-    if _session.book and _session.chapter and _session.current_verse:
-        _session.current_verse += 1
-        _session.start_verse = _session.current_verse
-        _session.end_verse = _session.current_verse
-        _session.is_range_mode = False
-        _session.last_updated = time.time()
-        print(f"⏭️ Advancing to verse {_session.current_verse}")
-        emit_session()
-
-
-def on_previous_command():
-    """Handle 'previous'/'go back' command"""
-    global _session
-    
-    if _session.book and _session.chapter and _session.current_verse and _session.current_verse > 1:
-        _session.current_verse -= 1
-        _session.start_verse = _session.current_verse
-        _session.end_verse = _session.current_verse
-        _session.is_range_mode = False
-        _session.last_updated = time.time()
-        print(f"⏮️ Going back to verse {_session.current_verse}")
-        emit_session()
-
-
-def detect_range(text: str) -> Optional[tuple[int, int]]:
-    """Detect verse range patterns like 'verse 2 to 3' or '4 through 9'"""
-    text_lower = text.lower()
-    
-    patterns = [
-        # "verse 2 to 3" or "verses 2 to 3"
-        r'verses?\s*(\d+)\s*(?:to|through|thru|and|-|,)\s*(\d+)',
-        # "2 to 3" standalone (now supports 'and' and ',')
-        r'(\d+)\s*(?:to|through|thru|-|and|,)\s*(\d+)',
-        # "from verse 2 to verse 3"
-        r'from\s*(?:verse\s*)?(\d+)\s*(?:to|through|thru)\s*(?:verse\s*)?(\d+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            start = int(match.group(1))
-            end = int(match.group(2))
-            if end > start:  # Valid range
-                print(f"📊 Range pattern matched: {start} to {end}")
-                return (start, end)
-    return None
+def set_emit_callback(callback: Callable):
+    """Set the callback for emitting session updates"""
+    _default.emit_callback = callback
+
+
+def emit_session():
+    """Emit current session to frontend"""
+    _default.emit_session()
 
 
 def is_next_command(text: str) -> bool:
@@ -293,104 +372,29 @@ def is_previous_command(text: str) -> bool:
     return any(cmd in text_lower for cmd in PREVIOUS_COMMANDS)
 
 
-def check_command_debounce() -> bool:
-    """Check if enough time has passed since last command"""
-    global _last_command_time
-    now = time.time()
-    if now - _last_command_time < COMMAND_DEBOUNCE:
-        print("⏭️ Command debounced (too fast)")
-        return False
-    _last_command_time = now
-    return True
+def process_text(text: str) -> Optional[dict]:
+    """Process incoming text with the default session"""
+    return _default.process_text(text)
 
 
-def process_text(text: str) -> Optional[dict]:
-    """
-    Process incoming text and update session.
-    Returns session dict if update occurred, None otherwise.
-    """
-    global _session
-    
-    normalized = normalize_text(text)
-    
-    # Check for next/continue commands (with debounce)
-    if is_next_command(text):
-        if check_command_debounce():
-            print("⏭️ Next command detected")
-            on_next_command()
-            return _session.to_dict() if _session.book else None
-        return None
-    
-    # Check for previous/back commands (with debounce)
-    if is_previous_command(text):
-        if check_command_debounce():
-            print("⏮️ Previous command detected")
-            on_previous_command()
-            return _session.to_dict() if _session.book else None
-        return None
-    
-    # Check for verse range
-    verse_range = detect_range(text)
-    
-    # Import here to avoid circular dependency
-    from state_machine import detect_book, extract_numbers
-    
-    book = detect_book(normalized)
-    numbers = extract_numbers(normalized)
-    
-    # Handle different cases
-    if book and len(numbers) >= 1:
-        chapter = numbers[0]
-        
-        if verse_range:
-            # Range detected: "Genesis 1:4-9"
-            on_range_detected(book, chapter, verse_range[0], verse_range[1])
-            return _session.to_dict()
-        elif len(numbers) >= 2:
-            # Book + chapter + verse
-            on_verse_detected(book, chapter, numbers[1])
-            return _session.to_dict()
-        else:
-            # Book + chapter only - start timer
-            on_chapter_detected(book, chapter)
-            return None  # Don't emit yet, wait for timer
-    
-    elif _session.book and _session.chapter:
-        # No book in text, but we have active session
-        
-        if verse_range:
-            on_range_detected(_session.book, _session.chapter, verse_range[0], verse_range[1])
-            return _session.to_dict()
-        
-        # Check for "verse X" pattern
-        verse_match = re.search(r'verse\s*(\d+)', normalized)
-        if verse_match:
-            on_explicit_verse(int(verse_match.group(1)))
-            return _session.to_dict()
-        
-        # Just numbers - might be verse update
-        if len(numbers) == 1 and "verse" in text.lower():
-            on_explicit_verse(numbers[0])
-            return _session.to_dict()
-    
-    return None
+def process_utterance(utterance: ParsedUtterance) -> Optional[dict]:
+    """Process a parsed utterance with the default session"""
+    return _default.process_utterance(utterance)
 
 
 def get_session() -> ScriptureSession:
     """Get current session"""
-    return _session
+    return _default.session
 
 
 def reset_session():
     """Reset the session"""
-    global _session
-    _cancel_chapter_timer()
-    _session = ScriptureSession()
+    _default.reset()
 
 
 # Test
 if __name__ == "__main__":
-    import time as t
+    import asyncio
     
     def test_emit(data):
         print(f"  → EMIT: {data}")
@@ -400,7 +404,7 @@ if __name__ == "__main__":
     print("\n🧪 Testing Session Manager:\n")
     
     tests = [
-        ("mark chapter 3", 2.5),  # Should auto-default to verse 1
+        ("mark chapter 3", 3.5),  # Should auto-default to verse 1
         ("genesis 1 4", 0),
         ("verse 5", 0),
         ("next verse", 0),
@@ -409,9 +413,12 @@ if __name__ == "__main__":
         ("next", 0),
     ]
     
-    for text, delay in tests:
-        print(f"\n  Input: '{text}'")
-        process_text(text)
-        if delay:
-            print(f"  (waiting {delay}s...)")
-            t.sleep(delay)
+    async def run_tests():
+        for text, delay in tests:
+            print(f"\n  Input: '{text}'")
+            process_text(text)
+            if delay:
+                print(f"  (waiting {delay}s...)")
+                await asyncio.sleep(delay)
+    
+    asyncio.run(run_tests())
@@ -9,15 +9,15 @@ Example flow:
 
 This handles real preaching where references are spoken over time.
 """
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
 import time
-import re
 
 from aliases import BOOK_ALIASES, BOOK_IDS
+from utterance import ParsedUtterance, parse_utterance
 
 
-@dataclass
+@dataclass(slots=True)
 class RefState:
     book: Optional[str] = None
     chapter: Optional[int] = None
@@ -49,117 +49,112 @@ class RefState:
         return s
 
 
-# Global state holder (per session)
-_state = RefState()
-
 # Timeout: reset state if no update for 30 seconds
 STATE_TIMEOUT = 30.0
 
 
-def extract_numbers(text: str) -> list[int]:
-    """Extract ordered numbers from text"""
-    return [int(n) for n in re.findall(r'\d+', text)]
+class ReferenceTracker:
+    """Reference state for one room or connection"""
+    __slots__ = ("state", "clock")
 
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.state = RefState()
+        # Wall clock for STATE_TIMEOUT (virtual in replays)
+        self.clock = clock
 
-def detect_book(text: str) -> Optional[str]:
-    """
-    Detect book name from normalized text.
-    Assumes normalization already ran (so "look" → "luke" etc.)
-    Returns canonical book name or None.
-    """
-    text_lower = text.lower()
+    def update(self, utterance: Union[ParsedUtterance, str]) -> Optional[dict]:
+        """
+        Update reference state from a parsed utterance (or raw text).
+        Returns the updated state dict if changed, None otherwise.
+        
+        This is the heart of the state machine.
+        """
+        if isinstance(utterance, str):
+            utterance = parse_utterance(utterance)
+    
+        now = self.clock()
+    
+        # Check for timeout - reset state if stale
+        if self.state.last_updated > 0 and (now - self.state.last_updated) > STATE_TIMEOUT:
+            self.state = RefState()
+    
+        detected_book = utterance.book
+        numbers = utterance.numbers
+    
+        changed = False
+    
+        # BOOK UPDATE
+        if detected_book and detected_book != self.state.book:
+            # New book detected - reset state
+            self.state = RefState(
+                book=detected_book,
+                chapter=None,
+                verse=None,
+                confidence=0.9,
+                last_updated=now
+            )
+            changed = True
     
-    # Check for each canonical book name
-    # Sort by length descending to match longer names first (e.g., "1 John" before "John")
-    sorted_books = sorted(BOOK_IDS.keys(), key=len, reverse=True)
+        # CHAPTER UPDATE
+        # If we have text with "verse" keyword and one number, update verse not chapter
+        is_verse_only = utterance.mentions_verse
+    
+        if self.state.book and len(numbers) >= 1:
+            if is_verse_only and self.state.chapter is not None and len(numbers) == 1:
+                # "verse 17" - update verse, keep chapter
+                new_verse = numbers[0]
+                if self.state.verse != new_verse:
+                    self.state.verse = new_verse
+                    self.state.confidence = 0.95
+                    self.state.last_updated = now
+                    changed = True
+            else:
+                # Normal case: first number is chapter
+                new_chapter = numbers[0]
+                if self.state.chapter != new_chapter:
+                    self.state.chapter = new_chapter
+                    self.state.verse = None  # Reset verse when chapter changes
+                    self.state.confidence = 0.92
+                    self.state.last_updated = now
+                    changed = True
+    
+        # VERSE UPDATE (from second number)
+        if self.state.book and len(numbers) >= 2:
+            new_verse = numbers[1]
+            if self.state.verse != new_verse:
+                self.state.verse = new_verse
+                self.state.confidence = 0.95
+                self.state.last_updated = now
+                changed = True
     
-    for book in sorted_books:
-        if book.lower() in text_lower:
-            return book
+        # Only return if we have at least book + chapter
+        if changed and self.state.is_complete():
+            return self.state.to_dict()
     
-    return None
+        return None
 
+    def reset(self):
+        """Reset the reference state"""
+        self.state = RefState()
 
-def update_reference(normalized_text: str) -> Optional[dict]:
-    """
-    Update reference state from normalized text.
-    Returns the updated state dict if changed, None otherwise.
-    
-    This is the heart of the state machine.
-    """
-    global _state
-    
-    now = time.time()
-    
-    # Check for timeout - reset state if stale
-    if _state.last_updated > 0 and (now - _state.last_updated) > STATE_TIMEOUT:
-        _state = RefState()
-    
-    detected_book = detect_book(normalized_text)
-    numbers = extract_numbers(normalized_text)
-    
-    changed = False
-    
-    # BOOK UPDATE
-    if detected_book and detected_book != _state.book:
-        # New book detected - reset state
-        _state = RefState(
-            book=detected_book,
-            chapter=None,
-            verse=None,
-            confidence=0.9,
-            last_updated=now
-        )
-        changed = True
-    
-    # CHAPTER UPDATE
-    # If we have text with "verse" keyword and one number, update verse not chapter
-    is_verse_only = "verse" in normalized_text.lower() or "vs" in normalized_text.lower()
-    
-    if _state.book and len(numbers) >= 1:
-        if is_verse_only and _state.chapter is not None and len(numbers) == 1:
-            # "verse 17" - update verse, keep chapter
-            new_verse = numbers[0]
-            if _state.verse != new_verse:
-                _state.verse = new_verse
-                _state.confidence = 0.95
-                _state.last_updated = now
-                changed = True
-        else:
-            # Normal case: first number is chapter
-            new_chapter = numbers[0]
-            if _state.chapter != new_chapter:
-                _state.chapter = new_chapter
-                _state.verse = None  # Reset verse when chapter changes
-                _state.confidence = 0.92
-                _state.last_updated = now
-                changed = True
-    
-    # VERSE UPDATE (from second number)
-    if _state.book and len(numbers) >= 2:
-        new_verse = numbers[1]
-        if _state.verse != new_verse:
-            _state.verse = new_verse
-            _state.confidence = 0.95
-            _state.last_updated = now
-            changed = True
-    
-    # Only return if we have at least book + chapter
-    if changed and _state.is_complete():
-        return _state.to_dict()
-    
-    return None
+
+# Default tracker used by the module-level API (CLI tests, single-room use)
+_default = ReferenceTracker()
+
+
+def update_reference(utterance: Union[ParsedUtterance, str]) -> Optional[dict]:
+    """Update the default tracker; see ReferenceTracker.update"""
+    return _default.update(utterance)
 
 
 def reset_state():
     """Reset the reference state"""
-    global _state
-    _state = RefState()
+    _default.reset()
 
 
 def get_current_state() -> RefState:
     """Get current state (for debugging)"""
-    return _state
+    return _default.state
 
 
 # Test cases
@@ -175,15 +170,16 @@ if __name__ == "__main__":
         "genesis",        # New book - resets
         "genesis 1",      # New book + chapter
         "1 1",            # Chapter and verse
+        "exodush chapter 11",          # Book glued to noise → Exodus 11
+        "look at exodush chapter 12",  # ...and it beats the "look" alias
     ]
     
     for text in utterances:
-        from normalize import normalize_text
-        normalized = normalize_text(text)
-        result = update_reference(normalized)
+        utterance = parse_utterance(text)
+        result = update_reference(utterance)
         
         print(f"  Input:  '{text}'")
-        print(f"  Normal: '{normalized}'")
-        print(f"  State:  {_state.as_string()}")
+        print(f"  Normal: '{utterance.normalized}'")
+        print(f"  State:  {get_current_state().as_string()}")
         print(f"  Emit:   {result}")
         print()
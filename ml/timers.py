@@ -0,0 +1,128 @@
+"""
+Hashed Timer Wheel
+Session timers (chapter → verse 1 default) for every room on one event loop
+
+Timers hash into a fixed ring of slots by their deadline tick, so
+scheduling and cancelling are O(1) and no thread is ever created. While
+any timer is pending, a single loop.call_later tick drives the wheel;
+without a running loop the wheel can be advanced by hand (tests, replay).
+"""
+import asyncio
+import itertools
+import math
+import time
+from typing import Callable, Optional
+
+# Wheel resolution and size: 50ms ticks, 256 slots ≈ 12.8s per revolution
+TICK = 0.05
+SLOTS = 256
+
+
+class TimerHandle:
+    """A scheduled callback; cancel() is O(1)"""
+    __slots__ = ("deadline", "tick", "seq", "callback", "wheel", "cancelled")
+
+    def __init__(self, wheel: "TimerWheel", deadline: float, tick: int,
+                 seq: int, callback: Callable):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.tick = tick
+        self.seq = seq
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self.wheel._discard(self)
+
+
+class TimerWheel:
+    """Hashed wheel of one-shot timers shared by all sessions"""
+
+    def __init__(self, tick: float = TICK, slots: int = SLOTS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        # Each slot is an insertion-ordered set of handles
+        self._slots: list[dict[TimerHandle, None]] = [{} for _ in range(slots)]
+        self._seq = itertools.count()
+        self._pending = 0
+        self._last_tick = math.floor(clock() / tick)
+        self._driver: Optional[asyncio.TimerHandle] = None
+        self._driver_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def call_later(self, delay: float, callback: Callable) -> TimerHandle:
+        """Run callback after delay seconds"""
+        deadline = self.clock() + delay
+        tick = max(math.ceil(deadline / self.tick), self._last_tick + 1)
+        handle = TimerHandle(self, deadline, tick, next(self._seq), callback)
+        self._slots[tick % len(self._slots)][handle] = None
+        self._pending += 1
+        self._ensure_driver()
+        return handle
+
+    def _discard(self, handle: TimerHandle):
+        slot = self._slots[handle.tick % len(self._slots)]
+        if slot.pop(handle, False) is None:
+            self._pending -= 1
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Fire every timer due by now (default: the wheel's clock)"""
+        now = self.clock() if now is None else now
+        end = math.floor(now / self.tick)
+        if end <= self._last_tick:
+            return 0
+
+        # At most one revolution needs scanning, however far time jumped
+        n = len(self._slots)
+        start = max(self._last_tick + 1, end - n + 1)
+        self._last_tick = end
+
+        due = []
+        for t in range(start, end + 1):
+            slot = self._slots[t % n]
+            if not slot:
+                continue
+            for handle in [h for h in slot if h.tick <= end]:
+                del slot[handle]
+                due.append(handle)
+        self._pending -= len(due)
+
+        # Deterministic order: deadline, then scheduling order
+        due.sort(key=lambda h: (h.deadline, h.seq))
+        fired = 0
+        for handle in due:
+            if handle.cancelled:
+                continue
+            handle.cancelled = True
+            fired += 1
+            try:
+                handle.callback()
+            except Exception as e:
+                print(f"❌ Timer callback failed: {e}")
+        return fired
+
+    def _ensure_driver(self):
+        """Start ticking on the running loop, if there is one"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop: advance() is called manually
+        if self._driver is not None and self._driver_loop is loop:
+            return
+        self._driver_loop = loop
+        self._driver = loop.call_later(self.tick, self._on_tick)
+
+    def _on_tick(self):
+        self._driver = None
+        self.advance()
+        if self._pending:
+            self._ensure_driver()
+
+
+# Shared wheel for all rooms in this process
+TIMERS = TimerWheel()
@@ -0,0 +1,126 @@
+"""
+Utterance Tracing
+What happened to each transcript, kept for the last N in a ring buffer
+
+Every inbound transcript gets a trace: an ID, its room and text, and a
+span per stage (normalize → queue → session branch → state machine →
+cascade → emit) with offsets, durations and the intermediate value each
+stage produced. Traces live in a ring of Trace objects allocated up
+front, so recording one is a few attribute stores and tuple appends;
+nothing is formatted until /debug/traces asks.
+
+A slot whose trace is still in flight when the ring wraps (e.g. stuck
+behind the model) is replaced with a fresh Trace rather than reused, so
+a late span can never land in someone else's trace.
+"""
+import itertools
+import time
+from typing import Any, Optional
+
+# Traces kept (newest replace oldest)
+CAPACITY = 1024
+
+
+class Trace:
+    """One transcript's journey through the resolver"""
+    __slots__ = ("trace_id", "room", "text", "is_final", "wall", "started",
+                 "spans", "outcome", "duration", "open")
+
+    def __init__(self):
+        self.trace_id = 0
+        self.room = ""
+        self.text = ""
+        self.is_final = False
+        self.wall = 0.0
+        self.started = 0.0
+        # (name, start offset s, duration s, detail)
+        self.spans: list[tuple] = []
+        self.outcome: Optional[str] = None
+        self.duration = 0.0
+        self.open = False
+
+    def span(self, name: str, start: float, end: float, detail: Any = None):
+        """Record a stage from perf_counter start/end values"""
+        self.spans.append((name, start - self.started, end - start, detail))
+
+    def finish(self, outcome: str, end: Optional[float] = None):
+        self.outcome = outcome
+        self.duration = (end or time.perf_counter()) - self.started
+        self.open = False
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": f"{self.trace_id:08x}",
+            "room": self.room,
+            "text": self.text,
+            "isFinal": self.is_final,
+            "at": round(self.wall, 3),
+            "outcome": self.outcome,
+            "durationMs": round(self.duration * 1000, 3) if not self.open else None,
+            "spans": [
+                {"name": name, "offsetMs": round(offset * 1000, 3),
+                 "durationMs": round(duration * 1000, 3), "detail": detail}
+                for name, offset, duration, detail in self.spans
+            ],
+        }
+
+
+class TraceBuffer:
+    """Fixed ring of the most recent traces"""
+
+    def __init__(self, capacity: int = CAPACITY):
+        self._ring = [Trace() for _ in range(capacity)]
+        self._next = 0
+        self._ids = itertools.count(1)
+        # Trace that emits should be attributed to (set around sync processing)
+        self.current: Optional[Trace] = None
+
+    def __len__(self) -> int:
+        return min(self._next, len(self._ring))
+
+    def start(self, room: str, text: str, is_final: bool, started: Optional[float] = None) -> Trace:
+        """Claim the oldest slot for a new transcript"""
+        index = self._next % len(self._ring)
+        self._next += 1
+        trace = self._ring[index]
+        if trace.open:
+            trace = self._ring[index] = Trace()
+        trace.trace_id = next(self._ids)
+        trace.room = room
+        trace.text = text
+        trace.is_final = is_final
+        trace.wall = time.time()
+        trace.started = started or time.perf_counter()
+        trace.spans.clear()
+        trace.outcome = None
+        trace.duration = 0.0
+        trace.open = True
+        return trace
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        for trace in self._ring:
+            if trace.trace_id and f"{trace.trace_id:08x}" == trace_id:
+                return trace
+        return None
+
+    def query(self, limit: int = 50, room: Optional[str] = None,
+              min_ms: float = 0.0, outcome: Optional[str] = None) -> list[dict]:
+        """Newest first, filtered"""
+        n = len(self._ring)
+        results = []
+        for i in range(1, len(self) + 1):
+            trace = self._ring[(self._next - i) % n]
+            if room and trace.room != room:
+                continue
+            if outcome and trace.outcome != outcome:
+                continue
+            if min_ms and (trace.open or trace.duration * 1000 < min_ms):
+                continue
+            results.append(trace.to_dict())
+            if len(results) >= limit:
+                break
+        return results
+
+
+# Shared buffer for this process
+TRACES = TraceBuffer()
@@ -1,36 +1,59 @@
-from transformers import T5Tokenizer, T5ForConditionalGeneration
-from torch.utils.data import Dataset, DataLoader
-import json
+from transformers import T5TokenizerFast, T5ForConditionalGeneration
+from torch.utils.data import DataLoader
+import os
+import sys
+import numpy as np
 import torch
+from pathlib import Path
+
+from classifier import (
+    BASE_MODEL, ReferenceClassifier, book_index, encode_number, load_tokenizer,
+)
+from pretokenize import TokenizedDataset, LengthBucketSampler, read_rows
 
 MODEL_NAME = "t5-small"
+DATA_PATH = "data/bible_resolver.jsonl"
+
+# Tokenization happens once up front, so workers only slice and pad
+NUM_WORKERS = min(4, os.cpu_count() or 1)
+
+def t5_target(row):
+    return f'{row["book"]}|{row["chapter"]}|{row["verse"] or ""}'
 
-class BibleDataset(Dataset):
+class BibleDataset(TokenizedDataset):
     def __init__(self, path):
-        self.data = [json.loads(l) for l in open(path)]
-        self.tokenizer = T5Tokenizer.from_pretrained(MODEL_NAME)
+        super().__init__(path, T5TokenizerFast.from_pretrained(MODEL_NAME), target_fn=t5_target, max_input=128, max_target=64)
 
-    def __len__(self):
-        return len(self.data)
+class ClassifierDataset(TokenizedDataset):
+    """Same rows, labelled for the classifier heads"""
+    def __init__(self, path):
+        super().__init__(path, load_tokenizer(BASE_MODEL), max_input=64)
+        rows = read_rows(path)
+        self.book = np.array([book_index(r["book"]) for r in rows], dtype=np.int64)
+        self.chapter = np.array([encode_number(r["chapter"]) for r in rows], dtype=np.int64)
+        self.verse = np.array([encode_number(r["verse"]) for r in rows], dtype=np.int64)
 
     def __getitem__(self, idx):
-        row = self.data[idx]
-        input_text = row["text"]
-        target = f'{row["book"]}|{row["chapter"]}|{row["verse"] or ""}'
-
-        inputs = self.tokenizer(input_text, return_tensors="pt", padding="max_length", truncation=True, max_length=128)
-        labels = self.tokenizer(target, return_tensors="pt", padding="max_length", truncation=True, max_length=64).input_ids
+        item = super().__getitem__(idx)
+        item["book"] = self.book[idx]
+        item["chapter"] = self.chapter[idx]
+        item["verse"] = self.verse[idx]
+        return item
 
-        return {
-            "input_ids": inputs.input_ids.squeeze(),
-            "attention_mask": inputs.attention_mask.squeeze(),
-            "labels": labels.squeeze()
-        }
+def make_loader(dataset, batch_size):
+    """Length-bucketed batches with dynamic padding, loaded in parallel"""
+    return DataLoader(
+        dataset,
+        batch_sampler=LengthBucketSampler(dataset.lengths, batch_size),
+        collate_fn=dataset.collate_fn(),
+        num_workers=NUM_WORKERS,
+        persistent_workers=NUM_WORKERS > 0,
+    )
 
 def train():
     print("Loading dataset...")
-    dataset = BibleDataset("data/bible_resolver.jsonl")
-    loader = DataLoader(dataset, batch_size=8, shuffle=True)
+    dataset = BibleDataset(DATA_PATH)
+    loader = make_loader(dataset, batch_size=8)
 
     print("Loading model...")
     model = T5ForConditionalGeneration.from_pretrained(MODEL_NAME)
@@ -64,5 +87,43 @@ def train():
     dataset.tokenizer.save_pretrained("model")
     print("Done!")
 
+def train_classifier():
+    print("Loading dataset...")
+    dataset = ClassifierDataset(DATA_PATH)
+    loader = make_loader(dataset, batch_size=32)
+
+    print("Loading model...")
+    model = ReferenceClassifier.from_base(BASE_MODEL)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=3e-4)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
+    print(f"Using device: {device}")
+    model.to(device)
+
+    model.train()
+    for epoch in range(8):
+        total_loss = 0
+        for i, batch in enumerate(loader):
+            batch = {k: v.to(device) for k, v in batch.items()}
+
+            optimizer.zero_grad()
+            loss, _ = model(**batch)
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+
+            if i % 50 == 0:
+                print(f"  Batch {i}, Loss: {loss.item():.4f}")
+
+        print(f"Epoch {epoch + 1} average loss: {total_loss / len(loader):.4f}")
+
+    print("Saving model...")
+    model.to("cpu").save(Path("model-classifier"))
+    dataset.tokenizer.save_pretrained("model-classifier")
+    print("Done!")
+
+# python train.py [t5|classifier]
+TARGETS = {"t5": train, "classifier": train_classifier}
+
 if __name__ == "__main__":
-    train()
+    TARGETS[sys.argv[1] if len(sys.argv) > 1 else "t5"]()
@@ -0,0 +1,226 @@
+"""
+Parsed Utterance
+Tokenizes and normalizes a transcript once for the whole pipeline
+
+Both the session manager and the reference state machine consume the same
+ParsedUtterance, so a websocket message is scanned a single time:
+  "fast corinthians tree sixteen" →
+    book=1 Corinthians, numbers=(3, 16), intent=reference
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from aliases import BOOK_IDS
+from lexicon import LEXICON, BOOK, NUMBER, splice, surface
+from cache import memoize
+
+# Commands that trigger "next"
+NEXT_COMMANDS = [
+    "next verse",
+    "next",
+    "continue",
+    "go on",
+    "keep going",
+    "move on",
+]
+
+# Commands that trigger "previous"
+PREVIOUS_COMMANDS = [
+    "previous verse",
+    "previous",
+    "go back",
+    "back",
+    "last verse",
+    "before",
+]
+
+# Utterance intents, in the order the session checks them
+NEXT = "next"
+PREVIOUS = "previous"
+REFERENCE = "reference"  # Book + numbers
+RANGE = "range"
+VERSE = "verse"
+
+_NEXT_RE = re.compile("|".join(re.escape(c) for c in NEXT_COMMANDS))
+_PREVIOUS_RE = re.compile("|".join(re.escape(c) for c in PREVIOUS_COMMANDS))
+_NUMBER_RE = re.compile(r'\d+')
+_VERSE_NUMBER_RE = re.compile(r'verse\s*(\d+)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# A canonical book name that starts a word but runs into noise ("exodush"),
+# which the word-bounded lexicon scan cannot see; longest names first.
+# Matched against the spliced text, so any run of spaces may separate words
+_BOOK_NAMES = {book.lower(): book for book in BOOK_IDS}
+_GLUED_BOOK_RE = re.compile(r'\b(?:' + "|".join(
+    re.escape(name).replace(r'\ ', r'\s+') for name in sorted(_BOOK_NAMES, key=len, reverse=True)
+) + r')(?=\w)')
+
+_RANGE_PATTERNS = [
+    # "verse 2 to 3" or "verses 2 to 3"
+    re.compile(r'verses?\s*(\d+)\s*(?:to|through|thru|and|-|,)\s*(\d+)'),
+    # "2 to 3" standalone (now supports 'and' and ',')
+    re.compile(r'(\d+)\s*(?:to|through|thru|-|and|,)\s*(\d+)'),
+    # "from verse 2 to verse 3"
+    re.compile(r'from\s*(?:verse\s*)?(\d+)\s*(?:to|through|thru)\s*(?:verse\s*)?(\d+)'),
+]
+
+
+@dataclass(frozen=True)
+class ParsedUtterance:
+    """Everything the resolvers need to know about one transcript"""
+    text: str
+    normalized: str
+    book: Optional[str] = None
+    book_span: Optional[tuple[int, int]] = None  # Offsets in text.lower(); None if glued
+    numbers: tuple[int, ...] = ()
+    number_spans: tuple[tuple[int, int], ...] = ()  # Offsets in text.lower()
+    verse_range: Optional[tuple[int, int]] = None
+    explicit_verse: Optional[int] = None  # Jump target for "verse 7"
+    mentions_verse: bool = False
+    intent: Optional[str] = None
+
+    @property
+    def is_next(self) -> bool:
+        return self.intent == NEXT
+
+    @property
+    def is_previous(self) -> bool:
+        return self.intent == PREVIOUS
+
+
+@memoize
+def detect_range(text: str) -> Optional[tuple[int, int]]:
+    """Detect verse range patterns like 'verse 2 to 3' or '4 through 9'"""
+    text_lower = text.lower()
+
+    for pattern in _RANGE_PATTERNS:
+        match = pattern.search(text_lower)
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2))
+            if end > start:  # Valid range
+                return (start, end)
+    return None
+
+
+@memoize
+def parse_utterance(text: str) -> ParsedUtterance:
+    """
+    Parse raw ASR text into a ParsedUtterance.
+
+    One lexicon scan yields the normalized text, the book span and the
+    number spans; commands are checked on the raw text and ranges on the
+    raw digits, exactly as the session manager always has.
+    """
+    lower = text.lower()
+    stripped = lower.strip()
+    offset = len(lower) - len(lower.lstrip())
+
+    matches = LEXICON.scan(stripped)
+    spliced = splice(stripped, matches)
+    normalized = _WHITESPACE_RE.sub(' ', spliced).strip()
+
+    # Book and numbers come from the same scan; digits inside the book
+    # name ("1 corinthians") are not chapter numbers
+    book = None
+    book_span = None
+    numbers = []
+    number_spans = []
+    # Where each number sits in the spliced text (to match glued books)
+    number_at = []
+    shift = 0
+    pos = 0
+    for m in matches + [None]:
+        gap_end = m.start if m else len(stripped)
+        for d in _NUMBER_RE.finditer(stripped, pos, gap_end):
+            numbers.append(int(d.group()))
+            number_spans.append((d.start() + offset, d.end() + offset))
+            number_at.append(d.start() + shift)
+        if m is None:
+            break
+        if m.kind == BOOK:
+            book = m.value
+            book_span = (m.start + offset, m.end + offset)
+        elif m.kind == NUMBER:
+            numbers.append(m.value)
+            number_spans.append((m.start + offset, m.end + offset))
+            number_at.append(m.start + shift)
+        shift += len(surface(m)) - (m.end - m.start)
+        pos = m.end
+
+    # Like the original substring match, a book name glued to noise beats
+    # a shorter alias elsewhere ("look at exodush 11" is Exodus, not Luke)
+    glued = max(_GLUED_BOOK_RE.finditer(spliced), key=lambda g: len(g.group()), default=None)
+    glued_book = _BOOK_NAMES[_WHITESPACE_RE.sub(' ', glued.group())] if glued else None
+    if glued_book and (book is None or len(glued_book) > len(book)):
+        book = glued_book
+        book_span = None
+        # The "1" of "1 kingsh" was scanned as a number; drop exactly that one
+        if glued.start() in number_at:
+            i = number_at.index(glued.start())
+            del numbers[i], number_spans[i]
+
+    verse_range = detect_range(text)
+    mentions_verse = "verse" in normalized or "vs" in normalized
+
+    explicit_verse = None
+    verse_match = _VERSE_NUMBER_RE.search(normalized)
+    if verse_match:
+        explicit_verse = int(verse_match.group(1))
+    elif len(numbers) == 1 and "verse" in lower:
+        explicit_verse = numbers[0]
+
+    if _NEXT_RE.search(lower):
+        intent = NEXT
+    elif _PREVIOUS_RE.search(lower):
+        intent = PREVIOUS
+    elif book and numbers:
+        intent = REFERENCE
+    elif verse_range:
+        intent = RANGE
+    elif explicit_verse is not None:
+        intent = VERSE
+    else:
+        intent = None
+
+    return ParsedUtterance(
+        text=text,
+        normalized=normalized,
+        book=book,
+        book_span=book_span,
+        numbers=tuple(numbers),
+        number_spans=tuple(number_spans),
+        verse_range=verse_range,
+        explicit_verse=explicit_verse,
+        mentions_verse=mentions_verse,
+        intent=intent,
+    )
+
+
+# Test cases
+if __name__ == "__main__":
+    print("🧪 Testing parse_utterance:\n")
+
+    cases = [
+        # text, expected book, expected numbers
+        ("fast corinthians tree sixteen", "1 Corinthians", (3, 16)),
+        ("john chapter three verse sixteen", "John", (3, 16)),
+        ("exodush chapter 11", "Exodus", (11,)),
+        ("look at exodush chapter 11", "Exodus", (11,)),
+        ("2 kingsh 26 1", "2 Kings", (26, 1)),
+        ("from two kingsh chap ter 20", "2 Kings", (20,)),
+        ("1 john 1 kingsh", "1 Kings", ()),
+        ("first john 2 kingsh 3", "2 Kings", (3,)),
+    ]
+
+    failed = 0
+    for text, book, numbers in cases:
+        u = parse_utterance(text)
+        ok = u.book == book and u.numbers == numbers
+        failed += not ok
+        print(f"  {'✅' if ok else '❌'} '{text}' → {u.book} {u.numbers} ({u.intent})")
+
+    print(f"\n{len(cases) - failed}/{len(cases)} passed")
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Model Worker Pool
+Runs the inference backend in child processes, off the server's GIL
+
+Each worker (`python workers.py <backend>`) loads the model once and
+answers newline-delimited JSON over its stdin/stdout pipes:
+  → {"id": 7, "texts": [...]}      ← {"id": 7, "outputs": [...]}
+  → {"id": 8, "op": "ping"}        ← {"id": 8, "pong": true, "rssMb": 212.4}
+The pool sends each batch to the least-loaded ready worker, times out
+requests, pings workers periodically and restarts any that crash, hang or
+stop answering. Meanwhile the resolver keeps serving the regex tier.
+"""
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+ML_DIR = Path(__file__).parent
+
+# Worker processes per pool
+WORKERS = 2
+
+# A batch taking longer than this marks its worker as hung
+REQUEST_TIMEOUT = 5.0
+
+# Liveness pings
+HEALTH_INTERVAL = 5.0
+HEALTH_TIMEOUT = 10.0
+
+# A worker that hasn't loaded its model by then is restarted
+LOAD_TIMEOUT = 120.0
+
+# Restart backoff, doubling per consecutive crash
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+
+
+class WorkerError(Exception):
+    """A worker died, hung, or failed a request"""
+
+
+class Worker:
+    """One child process and its in-flight requests"""
+    __slots__ = (
+        "index", "backend", "proc", "pending", "reader", "ready",
+        "started_at", "load_seconds", "warmup_seconds", "crashes", "restarts", "served",
+        "last_pong", "rss_mb",
+    )
+
+    def __init__(self, index: int, backend: str):
+        self.index = index
+        self.backend = backend
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.pending: dict[int, asyncio.Future] = {}
+        self.reader: Optional[asyncio.Task] = None
+        self.ready = False
+        self.started_at = 0.0
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.crashes = 0
+        self.restarts = 0
+        self.served = 0
+        self.last_pong = 0.0
+        self.rss_mb = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    def stats(self) -> dict:
+        return {
+            "worker": self.index,
+            "pid": self.proc.pid if self.proc else None,
+            "ready": self.ready,
+            "pending": len(self.pending),
+            "served": self.served,
+            "restarts": self.restarts,
+            "loadSeconds": round(self.load_seconds, 2),
+            "warmupSeconds": round(self.warmup_seconds, 2),
+            "rssMb": round(self.rss_mb, 1),
+            "lastPongAgo": round(time.monotonic() - self.last_pong, 1) if self.last_pong else None,
+        }
+
+
+class WorkerPool:
+    """N model processes behind the MicroBatcher backend interface"""
+
+    def __init__(self, backend: str, workers: int = WORKERS,
+                 request_timeout: float = REQUEST_TIMEOUT):
+        self.name = f"{backend}-pool"
+        self.backend = backend
+        # One batch in flight per worker (read by MicroBatcher)
+        self.concurrency = workers
+        self.request_timeout = request_timeout
+        self._workers = [Worker(i, backend) for i in range(workers)]
+        self._ids = itertools.count(1)
+        self._health_task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.timeouts = 0
+        self.errors = 0
+
+    async def start(self):
+        """Spawn every worker (must run on the serving loop)"""
+        for worker in self._workers:
+            await self._spawn(worker)
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _spawn(self, worker: Worker):
+        worker.ready = False
+        worker.started_at = time.monotonic()
+        worker.proc = await asyncio.create_subprocess_exec(
+            sys.executable, str(Path(__file__).resolve()), worker.backend,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=ML_DIR,
+        )
+        worker.reader = asyncio.create_task(self._read(worker, worker.proc))
+        print(f"🧵 Started {worker.backend} worker {worker.index} (pid {worker.proc.pid})")
+
+    async def _read(self, worker: Worker, proc: asyncio.subprocess.Process):
+        """Route replies to their requests; restart the worker on exit"""
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+
+            if msg.get("ready"):
+                worker.ready = True
+                worker.crashes = 0
+                worker.load_seconds = msg.get("loadSeconds", 0.0)
+                worker.warmup_seconds = msg.get("warmupSeconds", 0.0)
+                worker.last_pong = time.monotonic()
+                print(f"✅ Worker {worker.index} ready ({msg.get('backend')}, {worker.load_seconds:.1f}s)")
+                continue
+
+            future = worker.pending.pop(msg.get("id"), None)
+            if future is None or future.done():
+                continue  # Caller already timed out
+            if "error" in msg:
+                future.set_exception(WorkerError(msg["error"]))
+            else:
+                future.set_result(msg)
+
+        code = await proc.wait()
+        worker.ready = False
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(WorkerError(f"worker {worker.index} exited ({code})"))
+        worker.pending.clear()
+
+        if not self.closed:
+            print(f"💥 Worker {worker.index} exited with code {code}")
+            asyncio.create_task(self._restart(worker))
+
+    async def _restart(self, worker: Worker):
+        delay = min(RESTART_DELAY * 2 ** worker.crashes, MAX_RESTART_DELAY)
+        worker.crashes += 1
+        worker.restarts += 1
+        await asyncio.sleep(delay)
+        if not self.closed:
+            await self._spawn(worker)
+
+    def _kill(self, worker: Worker, reason: str):
+        """Kill a misbehaving worker; its reader restarts it"""
+        if worker.alive:
+            print(f"🔪 Killing worker {worker.index}: {reason}")
+            worker.ready = False
+            worker.proc.kill()
+
+    async def _call(self, worker: Worker, msg: dict, timeout: float) -> dict:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[request_id] = future
+        try:
+            worker.proc.stdin.write((json.dumps({"id": request_id, **msg}) + "\n").encode())
+            await worker.proc.stdin.drain()
+            return await asyncio.wait_for(future, timeout)
+        except (ConnectionError, BrokenPipeError) as e:
+            raise WorkerError(f"worker {worker.index} pipe closed") from e
+        finally:
+            worker.pending.pop(request_id, None)
+
+    async def generate(self, texts: list[str]) -> list[str]:
+        """Run one batch on the least-loaded ready worker"""
+        ready = [w for w in self._workers if w.ready]
+        if not ready:
+            raise WorkerError("no model worker is ready")
+        worker = min(ready, key=lambda w: len(w.pending))
+
+        try:
+            reply = await self._call(worker, {"texts": texts}, self.request_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._kill(worker, f"batch exceeded {self.request_timeout:g}s")
+            raise WorkerError("model worker timed out")
+        except WorkerError:
+            self.errors += 1
+            raise
+        worker.served += len(texts)
+        return reply["outputs"]
+
+    async def _ping(self, worker: Worker):
+        try:
+            reply = await self._call(worker, {"op": "ping"}, HEALTH_TIMEOUT)
+        except (asyncio.TimeoutError, WorkerError):
+            self._kill(worker, "missed health check")
+            return
+        worker.last_pong = time.monotonic()
+        worker.rss_mb = reply.get("rssMb", 0.0)
+
+    async def _health_loop(self):
+        while not self.closed:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            checks = []
+            for worker in self._workers:
+                if worker.ready:
+                    checks.append(self._ping(worker))
+                elif worker.alive and time.monotonic() - worker.started_at > LOAD_TIMEOUT:
+                    self._kill(worker, f"model not loaded after {LOAD_TIMEOUT:g}s")
+            if checks:
+                await asyncio.gather(*checks)
+
+    @property
+    def ready(self) -> int:
+        return sum(w.ready for w in self._workers)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "ready": self.ready,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "workers": [w.stats() for w in self._workers],
+        }
+
+    async def close(self):
+        self.closed = True
+        if self._health_task:
+            self._health_task.cancel()
+        for worker in self._workers:
+            if worker.alive:
+                worker.proc.stdin.close()
+                worker.proc.terminate()
+        for worker in self._workers:
+            if worker.proc is not None:
+                await worker.proc.wait()
+
+
+def run_worker(kind: str):
+    """Child process: load the backend, then serve requests until stdin closes"""
+    # Replies get the real stdout; anything else printing goes to stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    from inference import load_backend, warm_up
+    from procstats import rss_mb
+
+    start = time.perf_counter()
+    backend = load_backend(kind)
+    if backend is None:
+        print(f"❌ No {kind} model to serve", file=sys.stderr)
+        sys.exit(1)
+    load_seconds = time.perf_counter() - start
+    # Only report ready once the first real request will be fast
+    warmup_seconds = warm_up(backend)
+
+    def reply(msg: dict):
+        protocol.write(json.dumps(msg) + "\n")
+
+    reply({
+        "ready": True,
+        "backend": backend.name,
+        "loadSeconds": load_seconds,
+        "warmupSeconds": warmup_seconds,
+    })
+
+    for line in sys.stdin:
+        msg = json.loads(line)
+        try:
+            if msg.get("op") == "ping":
+                reply({"id": msg["id"], "pong": True, "rssMb": rss_mb()})
+            else:
+                reply({"id": msg["id"], "outputs": backend.generate(msg["texts"])})
+        except Exception as e:
+            reply({"id": msg["id"], "error": str(e)})
+
+
+if __name__ == "__main__":
+    run_worker(sys.argv[1] if len(sys.argv) > 1 else "auto")